@@ -0,0 +1,236 @@
+"""
+anomaly.py — Fiyat geçmişi üzerinde aykırı değer tespiti (kayan medyan / MAD).
+
+Her kontrolde yeni fiyat, ürünün son ANOMALY_WINDOW kaydının medyanı ve MAD'i
+(medyan mutlak sapma) ile karşılaştırılır. Fiyat hem medyandan hem de mevcut
+fiyattan ANOMALY_Z_THRESHOLD robust z-skorundan fazla saparsa geçmişe yazılmaz,
+alarm tetiklemez; price_anomalies tablosunda karantinaya alınır. Sonraki bir
+kontrol karantinadaki fiyatı doğrularsa gerçek bir seviye değişimi sayılır:
+karantinadaki kayıt geçmişe eklenir ve yeni fiyat normal şekilde kaydedilir.
+
+Toplu yeniden skorlama (tüm geçmiş):
+    python anomaly.py rescore            # yalnızca raporla
+    python anomaly.py rescore --apply    # aykırıları geçmişten karantinaya taşı
+
+Toplu skorlamada bir kayıt hem önceki hem sonraki pencereden saparsa aykırıdır
+(tek seferlik sıçrama); öncekinden sapıp sonrakilerle uyuşan kayıt seviye değişimidir.
+"""
+
+import argparse
+import bisect
+import itertools
+import os
+import time
+from collections import deque
+
+import database
+import metrics
+
+# Skorlamada kullanılan son kayıt sayısı
+ANOMALY_WINDOW = int(os.getenv("ANOMALY_WINDOW", "30"))
+
+# Bundan az geçmişi olan üründe skorlama yapılmaz
+ANOMALY_MIN_POINTS = 5
+
+# Robust z-skoru eşiği
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "6"))
+
+# MAD alt sınırı (medyanın oranı): fiyatı hiç değişmemiş üründe MAD=0 olur;
+# bu taban ile varsayılan eşikte ~%45'in altındaki değişimler aykırı sayılmaz
+ANOMALY_MAD_FLOOR = 0.05
+
+# Karantinadaki fiyatı doğrulayan kontrolün en fazla göreli farkı ve süresi
+ANOMALY_CONFIRM_TOLERANCE = 0.02
+ANOMALY_CONFIRM_SECONDS = 2 * 86400
+
+# Normal dağılımda MAD → standart sapma dönüşümü
+MAD_SCALE = 1.4826
+
+
+# ── İstatistik ────────────────────────────────────────────────────────────────
+
+def _median_sorted(values: list[float]) -> float:
+    n = len(values)
+    mid = n // 2
+    return values[mid] if n % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def _mad_sorted(values: list[float], median: float) -> float:
+    """
+    Sıralı listede MAD: sapmalar medyandan iki yöne birleştirilerek artan sırada
+    üretilir, ortadaki sapmaya ulaşınca durulur (sapmaları sıralamaya gerek yok).
+    """
+    n = len(values)
+    hi = bisect.bisect_left(values, median)
+    lo = hi - 1
+    deviations = []
+    while len(deviations) <= n // 2:
+        if hi >= n or (lo >= 0 and median - values[lo] <= values[hi] - median):
+            deviations.append(median - values[lo])
+            lo -= 1
+        else:
+            deviations.append(values[hi] - median)
+            hi += 1
+    mid = n // 2
+    return deviations[mid] if n % 2 else (deviations[mid - 1] + deviations[mid]) / 2
+
+
+def window_stats(values) -> tuple[float, float]:
+    """Returns: (medyan, MAD)"""
+    ordered = sorted(values)
+    median = _median_sorted(ordered)
+    return median, _mad_sorted(ordered, median)
+
+
+def robust_score(price: float, center: float, mad: float, median: float) -> float:
+    """|price - center| / (MAD_SCALE · max(MAD, taban · medyan))"""
+    spread = MAD_SCALE * max(mad, ANOMALY_MAD_FLOOR * abs(median))
+    return abs(price - center) / spread if spread else 0.0
+
+
+class RollingWindow:
+    """Son `size` değer; sıralı kopya tutulduğu için medyan ve MAD her adımda sıralama gerektirmez."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._values: deque[float] = deque()
+        self._sorted: list[float] = []
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def push(self, value: float):
+        self._values.append(value)
+        bisect.insort(self._sorted, value)
+        if len(self._values) > self.size:
+            old = self._values.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+
+    def stats(self) -> tuple[float, float]:
+        median = _median_sorted(self._sorted)
+        return median, _mad_sorted(self._sorted, median)
+
+
+# ── Kontrol anında ────────────────────────────────────────────────────────────
+
+def screen_price(product, price: float, source: str) -> dict | None:
+    """
+    Yeni fiyatı ürünün yakın geçmişine göre skorlar.
+    Returns: karantinaya alındıysa {"id", "price", "median", "score"}, kabul edildiyse None
+    """
+    pid = product["id"]
+    history = [row["price"] for row in database.get_price_history(pid, ANOMALY_WINDOW)]
+    if len(history) < ANOMALY_MIN_POINTS:
+        return None
+
+    median, mad = window_stats(history)
+    score = robust_score(price, median, mad, median)
+    if score <= ANOMALY_Z_THRESHOLD:
+        return None
+    # Onaylanmış bir seviye değişiminden sonra pencere henüz eski seviyede olabilir
+    current = product["current_price"]
+    if current is not None and robust_score(price, current, mad, median) <= ANOMALY_Z_THRESHOLD:
+        return None
+
+    pending = database.get_quarantined_anomaly(pid, int(time.time() - ANOMALY_CONFIRM_SECONDS))
+    if pending and abs(pending["price"] - price) <= ANOMALY_CONFIRM_TOLERANCE * abs(price):
+        database.confirm_price_anomaly(pending["id"])
+        metrics.ANOMALIES.inc(outcome="confirmed")
+        return None
+
+    anomaly_id = database.add_price_anomaly(pid, price, source, median, score)
+    metrics.ANOMALIES.inc(outcome="quarantined")
+    return {"id": anomaly_id, "price": price, "median": round(median, 2), "score": round(score, 2)}
+
+
+# ── Toplu yeniden skorlama ────────────────────────────────────────────────────
+
+def score_series(prices: list[float], window: int = ANOMALY_WINDOW,
+                 threshold: float = ANOMALY_Z_THRESHOLD) -> list[tuple[int, float, float]]:
+    """
+    Tek ürünün zaman sıralı fiyatlarında tek seferlik sıçramaları bulur.
+    Returns: [(indeks, önceki pencere medyanı, skor), ...]
+    """
+    n = len(prices)
+    trailing: list[tuple[float, float] | None] = [None] * n
+    win = RollingWindow(window)
+    for i, price in enumerate(prices):
+        if len(win) >= ANOMALY_MIN_POINTS:
+            trailing[i] = win.stats()
+        win.push(price)
+
+    flagged = []
+    win = RollingWindow(window)
+    for i in range(n - 1, -1, -1):
+        price = prices[i]
+        if trailing[i] is not None and len(win):
+            median, mad = trailing[i]
+            score = robust_score(price, median, mad, median)
+            if score > threshold:
+                lead_median, lead_mad = win.stats()
+                if robust_score(price, lead_median, lead_mad, lead_median) > threshold:
+                    flagged.append((i, median, score))
+        win.push(price)
+    flagged.reverse()
+    return flagged
+
+
+def rescore_history(product_id: int | None = None, window: int = ANOMALY_WINDOW,
+                    threshold: float = ANOMALY_Z_THRESHOLD, apply: bool = False,
+                    batch_size: int = 1000, sample_size: int = 50) -> dict:
+    """
+    Tüm fiyat geçmişini ürün ürün akıtarak yeniden skorlar (sabit bellek: tek ürünün
+    serisi, en fazla batch_size bekleyen kayıt ve sample_size örnek).
+    apply=True: aykırı kayıtlar price_history'den price_anomalies'e ('rescored') taşınır.
+    Returns: {"products", "scanned", "flagged" (sayı), "moved", "sample" (ilk aykırılar)}
+    """
+    scanned = products = flagged = moved = 0
+    batch: list[tuple] = []
+    sample: list[tuple] = []
+    rows = database.iter_history_for_rescore(product_id)
+    for pid, group in itertools.groupby(rows, key=lambda row: row["product_id"]):
+        series = [(row["recorded_at"], row["price"], row["source"]) for row in group]
+        products += 1
+        scanned += len(series)
+        for i, median, score in score_series([p for _, p, _ in series], window, threshold):
+            recorded_at, price, source = series[i]
+            row = (pid, recorded_at, price, source, median, score)
+            flagged += 1
+            if len(sample) < sample_size:
+                sample.append(row)
+            if apply:
+                batch.append(row)
+        if len(batch) >= batch_size:
+            moved += database.quarantine_history_rows(batch)
+            batch.clear()
+    if batch:
+        moved += database.quarantine_history_rows(batch)
+    return {"products": products, "scanned": scanned, "flagged": flagged, "moved": moved,
+            "sample": sample}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fiyat geçmişi aykırı değer analizi")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rescore = sub.add_parser("rescore", help="tüm geçmişi yeniden skorla")
+    rescore.add_argument("--product-id", type=int)
+    rescore.add_argument("--window", type=int, default=ANOMALY_WINDOW)
+    rescore.add_argument("--threshold", type=float, default=ANOMALY_Z_THRESHOLD)
+    rescore.add_argument("--apply", action="store_true",
+                         help="aykırıları geçmişten karantinaya taşı")
+    args = parser.parse_args()
+
+    database.setup_database()
+    start = time.perf_counter()
+    result = rescore_history(args.product_id, args.window, args.threshold, args.apply)
+    for pid, recorded_at, price, _, median, score in result["sample"]:
+        print(f"#{pid} {recorded_at}: {price} (medyan {median}, skor {score:.1f})")
+    if result["flagged"] > len(result["sample"]):
+        print(f"... ve {result['flagged'] - len(result['sample'])} kayıt daha")
+    print(f"{result['products']} ürün, {result['scanned']} kayıt, "
+          f"{result['flagged']} aykırı, {result['moved']} taşındı "
+          f"({time.perf_counter() - start:.1f} sn)")
+
+
+if __name__ == "__main__":
+    main()
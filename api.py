@@ -1,12 +1,33 @@
-from fastapi import FastAPI, HTTPException, Header, Depends
+import datetime
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Header, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, List
 import database
-from calibrate import calibrate_and_add_product, recalibrate_product
-from tracker import get_product_price
+import events
+import metrics
+import tracing
+import transfer
+
+# Kazıma yığını (calibrate/tracker → bs4, requests, Playwright) ilk kontrol veya
+# kalibrasyon isteğinde yüklenir; açılış ve --reload döngüsü onları beklemez.
+
 
-app = FastAPI(title="TagTrack API", version="2.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Şema güncelse yalnızca sürüm okunur (kilit/DDL yok)
+    database.setup_database()
+    yield
+
+
+app = FastAPI(title="TagTrack API", version="2.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,7 +37,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-database.setup_database()
+
+# ── Metrikler ────────────────────────────────────────────────────────────────
+
+HTTP_SECONDS = metrics.Histogram(
+    "tagtrack_http_request_seconds", "API istek süresi", ("method", "route", "status"))
+metrics.Gauge(
+    "tagtrack_queue_tasks", "Worker kuyruğundaki görevler (duruma göre)", ("status",),
+    callback=database.get_queue_stats)
+metrics.Gauge(
+    "tagtrack_sse_subscribers", "Açık /events bağlantıları",
+    callback=events.broker.subscriber_count)
+
+
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
 
 
 # ── Dependency ───────────────────────────────────────────────────────────────
@@ -31,6 +76,16 @@ async def get_user_id(x_user_id: Optional[str] = Header(None)):
     return x_user_id
 
 
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Yönetim uç noktaları kapalı (ADMIN_TOKEN tanımlı değil)")
+    if x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Geçersiz yönetici anahtarı")
+
+
 # ── Request / Response modelleri ─────────────────────────────────────────────
 
 class AddProductRequest(BaseModel):
@@ -61,6 +116,24 @@ def _product_or_404(product_id: int, user_id: str):
     return p
 
 
+# Zaman damgaları veritabanında epoch saniye; API yanıtları eski biçimleri korur
+
+def _product_dict(row) -> dict:
+    data = dict(row)
+    if data.get("last_checked_at") is not None:
+        data["last_checked_at"] = datetime.datetime.fromtimestamp(data["last_checked_at"]).isoformat()
+    return data
+
+
+def _history_dict(row) -> dict:
+    data = dict(row)
+    ts = data["recorded_at"]
+    data["recorded_at"] = datetime.datetime.fromtimestamp(
+        ts, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    data["ts"] = ts
+    return data
+
+
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @app.get("/health")
@@ -68,18 +141,26 @@ def health():
     return {"status": "ok", "version": "2.0.0"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus metin formatında süreç metrikleri."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/products")
 def get_products(user_id: str = Depends(get_user_id)):
-    return [dict(p) for p in database.get_all_products(user_id)]
+    return [_product_dict(p) for p in database.get_all_products(user_id)]
 
 
 @app.get("/products/{product_id}")
 def get_product(product_id: int, user_id: str = Depends(get_user_id)):
-    return dict(_product_or_404(product_id, user_id))
+    return _product_dict(_product_or_404(product_id, user_id))
 
 
 @app.post("/products", status_code=201)
 def add_product(req: AddProductRequest, user_id: str = Depends(get_user_id)):
+    from calibrate import calibrate_and_add_product
+
     try:
         result = calibrate_and_add_product(
             user_id, req.url, req.price_text, req.target_price, name=req.name
@@ -108,7 +189,7 @@ def update_product(product_id: int, req: UpdateProductRequest, user_id: str = De
         alert_price=req.alert_price,
         alert_enabled=req.alert_enabled,
     )
-    return {"success": True, "data": dict(database.get_product_by_id(product_id, user_id))}
+    return {"success": True, "data": _product_dict(database.get_product_by_id(product_id, user_id))}
 
 
 @app.delete("/products/{product_id}")
@@ -119,40 +200,32 @@ def delete_product(product_id: int, user_id: str = Depends(get_user_id)):
 
 
 @app.post("/products/{product_id}/check")
-def check_product_price(product_id: int, user_id: str = Depends(get_user_id)):
+def check_product_price(product_id: int, user_id: str = Depends(get_user_id), trace: bool = False):
     """
     Ürün fiyatını tüm stratejilerle (JSON-LD, meta, seçici vb.) anlık çeker.
     Hangi stratejinin başarılı olduğunu 'source' alanında döner.
+    Fiyat şüpheli bulunursa kaydedilmez; 'quarantined' alanında skoru döner.
+    trace=true: bu kontrol için iz kaydedilir (CHECK_PROFILING kapalı olsa da).
     """
+    from tracker import check_product
+
     product = _product_or_404(product_id, user_id)
-    selector = product["price_selector"]
-    fail_count = product["selector_fail_count"] or 0
-    active_selector = None if fail_count >= 3 else selector
 
     try:
-        price, source = get_product_price(
-            product["url"], active_selector, product["initial_price"]
-        )
+        result = check_product(product, trace=trace)
     except Exception as e:
-        database.record_selector_failure(product_id, str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
-    database.update_product_price(product_id, price, source)
-    database.add_price_history(product_id, price, source)
-
     updated = database.get_product_by_id(product_id, user_id)
-    alert_triggered = (
-        updated["alert_enabled"] == 1
-        and updated["alert_price"] is not None
-        and price <= updated["alert_price"]
-    )
     return {
         "success": True,
-        "current_price": price,
-        "source": source,
-        "alert_triggered": alert_triggered,
-        "selector_used": active_selector is not None,
-        "product": dict(updated),
+        "current_price": result["price"],
+        "source": result["source"],
+        "alert_triggered": result["alert_triggered"],
+        "selector_used": result["selector_used"],
+        "recalibrated": result["recalibrated"] is not None,
+        "quarantined": result["quarantined"],
+        "product": _product_dict(updated),
     }
 
 
@@ -162,6 +235,8 @@ def recalibrate(product_id: int, req: RecalibrateRequest, user_id: str = Depends
     Seçici stale olduğunda (veya kullanıcı istediğinde) sayfadan yeni seçici bulur.
     current_price_text: sayfada şu an görünen fiyat metni (örn: '1.299,00 TL')
     """
+    from calibrate import recalibrate_product
+
     _product_or_404(product_id, user_id)
     try:
         result = recalibrate_product(product_id, user_id, req.current_price_text)
@@ -171,47 +246,231 @@ def recalibrate(product_id: int, req: RecalibrateRequest, user_id: str = Depends
 
 
 @app.get("/products/{product_id}/history")
-def get_price_history(product_id: int, user_id: str = Depends(get_user_id), limit: int = 60):
-    """Son N fiyat kaydını döner (varsayılan 60)."""
+def get_price_history(product_id: int, user_id: str = Depends(get_user_id), limit: int = 60,
+                      since: Optional[int] = None, until: Optional[int] = None):
+    """
+    Son N fiyat kaydını döner (varsayılan 60), yeniden eskiye.
+    since / until: UTC epoch saniye aralığı [since, until). Her kayıtta 'ts' epoch değeridir.
+    """
+    _product_or_404(product_id, user_id)
+    rows = database.get_price_history(product_id, min(limit, 10000), since, until)
+    return [_history_dict(r) for r in rows]
+
+
+@app.get("/products/{product_id}/anomalies")
+def get_price_anomalies(product_id: int, user_id: str = Depends(get_user_id), limit: int = 50):
+    """
+    Karantinaya alınan şüpheli fiyatlar (yeniden eskiye).
+    status: quarantined (bekliyor), confirmed (doğrulandı, geçmişe eklendi),
+    rescored (toplu skorlamada geçmişten çıkarıldı).
+    """
     _product_or_404(product_id, user_id)
-    rows = database.get_price_history(product_id, limit)
-    return [dict(r) for r in rows]
+    rows = database.get_price_anomalies(product_id, min(limit, 1000))
+    return [_history_dict(r) for r in rows]
 
 
 @app.post("/check-all")
-def check_all_prices():
-    """Tüm ürünlerin fiyatını toplu kontrol eder (arka plan işi gibi çalışır)."""
+def check_all_prices(queued: bool = False):
+    """
+    Tüm ürünlerin fiyatını toplu kontrol eder (arka plan işi gibi çalışır).
+    queued=true: kontrol inline yapılmaz, görevler worker kuyruğuna eklenir.
+    """
     # Not: Bu tüm kullanıcıların ürünlerini kontrol eder.
+    if queued:
+        added = database.enqueue_due_products()
+        return {"queued": added, "queue": database.get_queue_stats()}
+
+    from tracker import check_product
+
     products = database.get_all_products()
     results = []
     for product in products:
         pid = product["id"]
-        fail_count = product["selector_fail_count"] or 0
-        active_selector = None if fail_count >= 3 else product["price_selector"]
         try:
-            price, source = get_product_price(
-                product["url"], active_selector, product["initial_price"]
-            )
-            database.update_product_price(pid, price, source)
-            database.add_price_history(pid, price, source)
-            alert_triggered = (
-                product["alert_enabled"] == 1
-                and product["alert_price"] is not None
-                and price <= product["alert_price"]
-            )
+            result = check_product(product)
             results.append({
                 "id": pid,
                 "name": product["name"],
-                "current_price": price,
-                "source": source,
-                "alert_triggered": alert_triggered,
+                "current_price": result["price"],
+                "source": result["source"],
+                "alert_triggered": result["alert_triggered"],
+                "recalibrated": result["recalibrated"] is not None,
+                "quarantined": result["quarantined"],
             })
         except Exception as e:
-            database.record_selector_failure(pid, str(e))
             results.append({"id": pid, "error": str(e)})
     return {"results": results}
 
 
+@app.get("/events")
+async def stream_events(
+    user_id: str = Depends(get_user_id),
+    last_event_id: Optional[int] = Header(None),
+    since: Optional[int] = None,
+):
+    """
+    Kullanıcının fiyat değişikliği / alarm olaylarını Server-Sent Events olarak akıtır.
+    Yeniden bağlanırken Last-Event-ID başlığı (veya ?since=) ile kalınan yerden devam edilir.
+    """
+    resume_from = last_event_id if last_event_id is not None else since
+    return StreamingResponse(
+        events.stream(user_id, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ── Dışa / içe aktarım ───────────────────────────────────────────────────────
+
+# İçe aktarımda tek transaction'da yazılan kayıt sayısı
+IMPORT_BATCH_SIZE = 500
+
+# Yanıtta döndürülen en fazla satır hatası
+IMPORT_MAX_ERRORS = 100
+
+
+def _format_or_400(fmt: str) -> str:
+    try:
+        return transfer.check_format(fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _export(rows, fmt: str, name: str):
+    return StreamingResponse(
+        transfer.encode_rows(rows, fmt),
+        media_type=transfer.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@app.get("/export/products")
+def export_products(format: str = "ndjson", user_id: str = Depends(get_user_id)):
+    """Kullanıcının ürünlerini NDJSON/CSV olarak akıtır (sabit bellek)."""
+    fmt = _format_or_400(format)
+    return _export(database.iter_products(user_id), fmt, "products")
+
+
+@app.get("/export/history")
+def export_history(format: str = "ndjson", user_id: str = Depends(get_user_id)):
+    """Kullanıcının tüm fiyat geçmişini NDJSON/CSV olarak akıtır."""
+    fmt = _format_or_400(format)
+    return _export(database.iter_price_history(user_id), fmt, "price_history")
+
+
+async def _import(request: Request, fmt: str, normalize, flush) -> dict:
+    """İstek gövdesini satır satır okur, IMPORT_BATCH_SIZE'lık partilerle flush eder."""
+    batch, errors = [], []
+    error_count = 0
+    async for lineno, record in transfer.iter_records(request.stream(), fmt):
+        try:
+            if isinstance(record, Exception):
+                raise record
+            batch.append(normalize(record))
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({"line": lineno, "error": str(e)})
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await run_in_threadpool(flush, batch)
+            batch = []
+    if batch:
+        await run_in_threadpool(flush, batch)
+    return {"error_count": error_count, "errors": errors}
+
+
+@app.post("/import/products")
+async def import_products(request: Request, format: str = "ndjson",
+                          user_id: str = Depends(get_user_id)):
+    """
+    Toplu ürün ekleme. Her kayıt: url, target_price, price_text (veya initial_price),
+    isteğe bağlı name, alert_price, alert_enabled, price_selector(s).
+    Seçicisi olmayan ürünler inline kalibre edilmez; worker kuyruğuna 'calibrate'
+    görevi olarak eklenir. Aynı URL zaten takip ediliyorsa kayıt atlanır.
+    """
+    fmt = _format_or_400(format)
+    totals = {"inserted": 0, "skipped": 0, "calibration_queued": 0}
+
+    def flush(batch):
+        queued, inserted, skipped = database.bulk_add_products(user_id, batch)
+        totals["inserted"] += inserted
+        totals["skipped"] += skipped
+        totals["calibration_queued"] += len(queued)
+
+    result = await _import(request, fmt, transfer.normalize_product, flush)
+    return {**totals, **result}
+
+
+@app.post("/import/history")
+async def import_history(request: Request, format: str = "ndjson",
+                         user_id: str = Depends(get_user_id)):
+    """
+    Fiyat geçmişi içe aktarımı (export/history çıktısıyla uyumlu).
+    Kayıtlar url ile kullanıcının ürünlerine eşlenir; bilinmeyen URL'ler atlanır.
+    recorded_at: epoch saniye veya tarih metni (saat dilimi yoksa UTC).
+    Aynı dosyayı tekrar yüklemek kayıtları çoğaltmaz.
+    """
+    fmt = _format_or_400(format)
+    product_ids = await run_in_threadpool(database.get_product_ids_by_url, user_id)
+    totals = {"inserted": 0, "skipped": 0}
+
+    def flush(batch):
+        rows = [(product_ids[url], price, source, recorded_at)
+                for url, price, source, recorded_at in batch if url in product_ids]
+        inserted = database.bulk_add_price_history(rows) if rows else 0
+        totals["inserted"] += inserted
+        # bilinmeyen URL'ler ve zaten kayıtlı (ürün, zaman) çiftleri
+        totals["skipped"] += len(batch) - inserted
+
+    result = await _import(request, fmt, transfer.normalize_history, flush)
+    return {**totals, **result}
+
+
+# ── Yönetim: kontrol izleri ──────────────────────────────────────────────────
+
+def _trace_dict(row) -> dict:
+    data = dict(row)
+    data["stages"] = json.loads(data["stages"] or "{}")
+    data["candidates"] = json.loads(data["candidates"] or "{}")
+    data["has_html"] = bool(data.pop("codec"))
+    return data
+
+
+@app.get("/admin/traces", dependencies=[Depends(require_admin)])
+def list_traces(limit: int = 20, order: str = "slowest",
+                product_id: Optional[int] = None, failed: bool = False):
+    """En yavaş (order=slowest) veya en yeni (order=recent) kontrol izleri."""
+    rows = database.get_check_traces(min(limit, 500), order, product_id, failed)
+    return [_trace_dict(r) for r in rows]
+
+
+@app.get("/admin/traces/{trace_id}", dependencies=[Depends(require_admin)])
+def get_trace(trace_id: int):
+    row = database.get_check_trace(trace_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="İz bulunamadı")
+    return _trace_dict(row)
+
+
+@app.get("/admin/traces/{trace_id}/html", dependencies=[Depends(require_admin)])
+def get_trace_html(trace_id: int):
+    """Kontrolün sayfa arşivindeki ham HTML'i (SNAPSHOTS_ENABLED=1)."""
+    row = database.get_check_trace(trace_id)
+    html = tracing.load_html(row) if row else None
+    if html is None:
+        raise HTTPException(status_code=404, detail="Sayfa arşivde yok")
+    return PlainTextResponse(html, media_type="text/html; charset=utf-8")
+
+
+@app.post("/admin/traces/{trace_id}/replay", dependencies=[Depends(require_admin)])
+def replay_trace(trace_id: int):
+    """Arşivdeki sayfa üzerinde fiyat çıkarımını ağ erişimi olmadan yeniden çalıştırır."""
+    try:
+        return tracing.replay(trace_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,116 @@
+"""
+bench_startup.py — Giriş noktalarının açılış süresi ölçümü.
+
+Her giriş noktası temiz bir Python sürecinde --runs kez içe aktarılır ve
+açılış işi (api için setup_database) çalıştırılır. Rapor: medyan / en kötü
+içe aktarma ve açılış süresi, süreç toplam süresi, en pahalı modüller
+(-X importtime) ve ağır kazıma yığınından (Playwright, requests, bs4) hangilerinin
+yüklendiği. Ölçüm her zaman geçici bir SQLite dosyasında yapılır: ortamdaki
+DB_PATH / DATABASE_URL (örn. api container'ında) yok sayılır.
+
+    python bench_startup.py
+    python bench_startup.py --runs 10 --budget-ms 400   # api aşarsa çıkış kodu 1
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# (giriş noktası, içe aktarmadan sonra çalışan açılış işi)
+ENTRY_POINTS = {
+    "api": "database.setup_database()",
+    "tracker": "",
+    "calibrate": "",
+    "worker": "",
+}
+
+HEAVY_MODULES = ("playwright.sync_api", "requests", "bs4")
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+import database
+t1 = time.perf_counter()
+{startup}
+t2 = time.perf_counter()
+print(json.dumps({{"import": t1 - t0, "startup": t2 - t1,
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _run(module: str, env: dict) -> dict:
+    code = _PROBE.format(module=module, startup=ENTRY_POINTS[module] or "pass",
+                         heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True,
+                          text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - start
+    return result
+
+
+def _top_imports(module: str, env: dict, n: int = 5) -> list[tuple[str, float]]:
+    """-X importtime çıktısından kümülatif süresi en yüksek n bağımlılık (ms)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit() and name != module:
+            rows.append((name, int(cumulative) / 1000))
+    return sorted(rows, key=lambda r: r[1], reverse=True)[:n]
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:7.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Giriş noktası açılış süresi ölçümü")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modules", nargs="+", default=list(ENTRY_POINTS),
+                        choices=list(ENTRY_POINTS))
+    parser.add_argument("--budget-ms", type=float, default=0,
+                        help="api içe aktarma+açılış medyanı bu süreyi aşarsa çıkış kodu 1")
+    parser.add_argument("--top", type=int, default=5, help="gösterilecek en pahalı modül sayısı")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        # Üretim veritabanına bağlanılmasın ve göç uygulanmasın
+        env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+        env.update(PYTHONPATH=here, DB_PATH=os.path.join(tmp, "bench.db"))
+        # Şema bir kez kurulur; ölçülen, güncel şemadaki açılıştır
+        subprocess.run([sys.executable, "-c", "import database; database.setup_database()"],
+                       env=env, capture_output=True, check=True)
+
+        print(f"{'giriş':<10} {'import ms':>9} {'açılış ms':>9} {'süreç ms':>9} "
+              f"{'en kötü':>8}  ağır modüller")
+        failed = False
+        for module in args.modules:
+            runs = [_run(module, env) for _ in range(args.runs)]
+            imp = statistics.median(r["import"] for r in runs)
+            startup = statistics.median(r["startup"] for r in runs)
+            process = statistics.median(r["process"] for r in runs)
+            worst = max(r["import"] + r["startup"] for r in runs)
+            print(f"{module:<10} {_ms(imp):>9} {_ms(startup):>9} {_ms(process):>9} "
+                  f"{_ms(worst):>8}  {', '.join(runs[0]['heavy']) or '-'}")
+            for name, ms in _top_imports(module, env, args.top):
+                print(f"{'':<10}   {ms:7.1f} ms  {name}")
+            if module == "api" and args.budget_ms and (imp + startup) * 1000 > args.budget_ms:
+                failed = True
+    if failed:
+        print(f"api açılışı bütçeyi ({args.budget_ms} ms) aştı.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
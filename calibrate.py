@@ -2,10 +2,20 @@
 calibrate.py — Sayfa analizi, CSS seçici tespiti ve yeniden kalibrasyon.
 """
 
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from urllib.parse import urlparse
+
 import database
-import requests
+import metrics
+import slicer
+import tracing
+import soupsieve as sv
 from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+from bs4.element import CData, NavigableString, Tag
 from price_utils import extract_price_from_text
 
 
@@ -20,65 +30,283 @@ POPUP_SELECTORS = [
     "[class*='cookie'] button",
 ]
 
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+
+# Fiyatın DOM'a geldiğini gösteren genel işaretler; yalnızca kalibre seçicisi
+# olmayan ürünlerde beklenir (networkidle yerine)
+PRICE_READY_SELECTORS = [
+    "script[type='application/ld+json']",
+    "meta[property='product:price:amount']",
+    "[itemprop='price']",
+    "[class*='price']",
+    "[class*='fiyat']",
+]
+
+# Fiyat için gereksiz, ağır kaynak tipleri
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+
+# Reklam / analitik / izleme hostları (alt alan adları dahil)
+BLOCKED_HOSTS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "criteo.com",
+    "criteo.net",
+    "adnxs.com",
+    "taboola.com",
+    "outbrain.com",
+    "mc.yandex.ru",
+    "analytics.tiktok.com",
+    "useinsider.com",
+)
+
+# Render profilleri:
+#   block_resources / block_hosts  → istek yakalama ile iptal edilenler
+#   wait_until                     → page.goto bekleme koşulu
+#   wait_for_price                 → fiyat işaretini bekle (ms, 0 = bekleme)
+#   popups                         → tıklanacak popup seçicileri (görünürse)
+#   scroll / settle_ms             → lazy-load için kaydırma ve sabit bekleme
+RENDER_PROFILES = {
+    "light": {
+        "block_resources": BLOCKED_RESOURCE_TYPES,
+        "block_hosts": BLOCKED_HOSTS,
+        "wait_until": "domcontentloaded",
+        "wait_for_price": 8000,
+        "popups": [],
+        "scroll": False,
+        "settle_ms": 0,
+    },
+    # Eski davranış: her şey yüklenir, networkidle + popup döngüsü
+    "full": {
+        "block_resources": set(),
+        "block_hosts": (),
+        "wait_until": "networkidle",
+        "wait_for_price": 0,
+        "popups": POPUP_SELECTORS,
+        "scroll": True,
+        "settle_ms": 1500,
+    },
+}
+
+DEFAULT_RENDER_PROFILE = os.getenv("RENDER_PROFILE", "light")
+
+# 0: Playwright katmanı atlanır, sayfalar doğrudan requests ile çekilir
+# (Chromium olmayan ortamlar, çevrimdışı yük testi)
+BROWSER_FETCH = os.getenv("BROWSER_FETCH", "1") == "1"
+
+# Süreç başına eşzamanlı Chromium sayısı; fazlası sıra bekler (bellek sınırı)
+MAX_BROWSERS = int(os.getenv("MAX_BROWSERS", "2"))
+BROWSER_SLOTS = threading.BoundedSemaphore(MAX_BROWSERS)
+metrics.BROWSERS_MAX.set(MAX_BROWSERS)
+metrics.BROWSERS_ACTIVE.set(0)
+
+# Alan adına özel profil / ayar. Popup yalnızca fiyatı örten sitelerde tanımlanır.
+#   "ornek.com": {"profile": "full"}
+#   "ornek.com": {"popups": ["#onetrust-accept-btn-handler"], "scroll": True}
+DOMAIN_RENDER_RULES = {
+    "trendyol.com": {"popups": ["#onetrust-accept-btn-handler"]},
+    "hepsiburada.com": {"popups": ["#onetrust-accept-btn-handler"]},
+}
+
+
+def _host_matches(host: str, domains) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def get_render_profile(url: str, profile: str | None = None) -> dict:
+    """URL için geçerli render ayarları: temel profil + alan adı kuralları."""
+    host = (urlparse(url).hostname or "").lower()
+    rules = {}
+    for domain, domain_rules in DOMAIN_RENDER_RULES.items():
+        if _host_matches(host, (domain,)):
+            rules = domain_rules
+            break
+    name = profile or rules.get("profile") or DEFAULT_RENDER_PROFILE
+    settings = dict(RENDER_PROFILES.get(name, RENDER_PROFILES["light"]))
+    settings.update({k: v for k, v in rules.items() if k != "profile"})
+    settings["name"] = name
+    return settings
+
+
+def _install_blocking(context, settings: dict):
+    blocked_types = settings["block_resources"]
+    blocked_hosts = settings["block_hosts"]
+    if not blocked_types and not blocked_hosts:
+        return
 
-def close_popups(page):
-    for selector in POPUP_SELECTORS:
+    def handle(route):
+        request = route.request
+        host = (urlparse(request.url).hostname or "").lower()
+        if request.resource_type in blocked_types or _host_matches(host, blocked_hosts):
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", handle)
+
+
+def close_popups(page, selectors=POPUP_SELECTORS):
+    """Yalnızca o an görünür olan popup'ları kapatır; olmayanı beklemez."""
+    for selector in selectors:
         try:
-            page.locator(selector).click(timeout=1500)
+            locator = page.locator(selector).first
+            if locator.is_visible():
+                locator.click(timeout=1500)
         except Exception:
             pass
 
 
-def fetch_html(url: str) -> str:
+# Seçicilerden birinin elementi DOM'da ve metni boş değil mi (JS ile dolan fiyat)
+_PRICE_FILLED_JS = """selectors => selectors.some(s => {
+    const el = document.querySelector(s);
+    return el !== null && el.textContent.trim().length > 0;
+})"""
+
+# Her seçicinin document.querySelector için geçerli olup olmadığı
+_VALID_SELECTORS_JS = """selectors => selectors.map(s => {
+    try { document.querySelector(s); return true; } catch (e) { return false; }
+})"""
+
+
+def _wait_for_price(page, timeout_ms: int, wait_selectors=None):
     """
-    Playwright ile tam render; başarısız olursa requests fallback.
+    Ürünün kalibre seçicilerinden biri DOM'a gelip metni dolana kadar bekler.
+    Genel işaretler (PRICE_READY_SELECTORS) sunucu HTML'inde çoğunlukla zaten
+    bulunduğundan yalnızca seçicisi olmayan üründe (ilk kalibrasyon) beklenir.
+    Geçersiz seçiciler tek tek elenir; zaman aşımı ve geçersiz seçici
+    tagtrack_wait_price_total'a yazılır, o ana kadar render edilen içerik kullanılır.
     """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+    selectors = [s for s in (wait_selectors or []) if ":-soup-" not in s]
     try:
+        if selectors:
+            valid = page.evaluate(_VALID_SELECTORS_JS, selectors)
+            invalid = valid.count(False)
+            if invalid:
+                metrics.WAIT_PRICE.inc(invalid, outcome="invalid_selector")
+                tracing.count("wait_price.invalid", invalid)
+            selectors = [s for s, ok in zip(selectors, valid) if ok]
+            if not selectors:
+                return
+            page.wait_for_function(_PRICE_FILLED_JS, arg=selectors, timeout=timeout_ms)
+        else:
+            page.wait_for_selector(", ".join(PRICE_READY_SELECTORS), state="attached",
+                                   timeout=timeout_ms)
+        metrics.WAIT_PRICE.inc(outcome="ready")
+    except PlaywrightTimeout:
+        metrics.WAIT_PRICE.inc(outcome="timeout")
+        tracing.count("wait_price.timeout", 1)
+    except Exception as exc:
+        # Sayfa kapandı / gezinme sürdü: bekleme atlanır ama görünür kalır
+        metrics.WAIT_PRICE.inc(outcome="error")
+        print(f"Fiyat beklenemedi ({page.url}): {exc}")
+
+
+def _fetch_with_browser(url: str, settings: dict, wait_selectors=None) -> str:
+    # Playwright (~100 ms içe aktarma) yalnızca ilk sayfa çekiminde yüklenir
+    from playwright.sync_api import sync_playwright
+
+    with BROWSER_SLOTS, metrics.BROWSERS_ACTIVE.track_inprogress():
         with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                    "--window-size=1920,1080",
-                ],
-            )
-            context = browser.new_context(
-                user_agent=(
-                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/122.0.0.0 Safari/537.36"
-                ),
-                viewport={"width": 1920, "height": 1080},
-            )
-            page = context.new_page()
-            page.set_default_timeout(20000)
-            page.goto(url, wait_until="networkidle")
-            close_popups(page)
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight / 2);")
-            page.wait_for_timeout(1500)
-            html = page.content()
+            with tracing.stage("fetch.launch"):
+                browser = p.chromium.launch(
+                    headless=True,
+                    args=[
+                        "--disable-blink-features=AutomationControlled",
+                        "--no-sandbox",
+                        "--disable-dev-shm-usage",
+                        "--window-size=1920,1080",
+                    ],
+                )
+                context = browser.new_context(
+                    user_agent=USER_AGENT,
+                    viewport={"width": 1920, "height": 1080},
+                )
+                _install_blocking(context, settings)
+                page = context.new_page()
+                page.set_default_timeout(20000)
+            with tracing.stage(f"fetch.goto.{settings['wait_until']}"):
+                page.goto(url, wait_until=settings["wait_until"])
+            if settings["wait_for_price"]:
+                with tracing.stage("fetch.wait_price"):
+                    _wait_for_price(page, settings["wait_for_price"], wait_selectors)
+            if settings["popups"]:
+                with tracing.stage("fetch.popups"):
+                    close_popups(page, settings["popups"])
+            if settings["scroll"]:
+                page.evaluate("window.scrollTo(0, document.body.scrollHeight / 2);")
+            if settings["settle_ms"]:
+                with tracing.stage("fetch.settle"):
+                    page.wait_for_timeout(settings["settle_ms"])
+            with tracing.stage("fetch.content"):
+                html = page.content()
             browser.close()
             return html
-    except Exception:
-        resp = requests.get(
-            url,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/122.0.0.0 Safari/537.36"
-                )
-            },
-            timeout=20,
-        )
+
+
+def _fetch_with_requests(url: str) -> str:
+    import requests
+
+    resp = requests.get(
+        url,
+        headers={"User-Agent": USER_AGENT},
+        timeout=20,
+        stream=True,
+    )
+    with resp:
         resp.raise_for_status()
-        return resp.text
+        # MAX_HTML_BYTES'ı aşan gövde indirilmez
+        body = bytearray()
+        for chunk in resp.iter_content(slicer.FEED_CHUNK):
+            body += chunk
+            if len(body) > slicer.MAX_HTML_BYTES:
+                break
+    return body.decode(resp.encoding or "utf-8", errors="replace")
+
+
+def fetch_page(url: str, profile: str | None = None, wait_selectors=None) -> tuple[str, str]:
+    """
+    Playwright ile render; başarısız olursa (veya BROWSER_FETCH=0) requests fallback.
+    profile: RENDER_PROFILES anahtarı (varsayılan: alan adı kuralı / RENDER_PROFILE).
+    wait_selectors: beklenecek kalibre seçiciler (ürünün seçici seti).
+    HTML slicer.MAX_HTML_BYTES ile sınırlanır.
+    Returns: (html, katman) — katman "playwright" veya "requests"
+    """
+    if BROWSER_FETCH:
+        settings = get_render_profile(url, profile)
+        try:
+            with metrics.FETCH_SECONDS.time(tier="playwright"), tracing.stage("fetch.playwright"):
+                return slicer.cap_html(_fetch_with_browser(url, settings, wait_selectors)), "playwright"
+        except Exception:
+            metrics.FETCH_ERRORS.inc(tier="playwright")
+    try:
+        with metrics.FETCH_SECONDS.time(tier="requests"), tracing.stage("fetch.requests"):
+            return slicer.cap_html(_fetch_with_requests(url)), "requests"
+    except Exception:
+        metrics.FETCH_ERRORS.inc(tier="requests")
+        raise
 
 
-def get_css_selector(element) -> str:
-    """Element için stabil CSS selector üretir. ID bulursa kısa yol keser."""
+def fetch_html(url: str, profile: str | None = None, wait_selectors=None) -> str:
+    """fetch_page'in yalnızca HTML döndüren kısayolu."""
+    return fetch_page(url, profile, wait_selectors)[0]
+
+
+def get_css_selector(element, index: "CandidateIndex | None" = None) -> str:
+    """
+    Element için stabil CSS selector üretir. ID bulursa kısa yol keser.
+    index verilirse nth-of-type pozisyonları önceden hesaplanmış tablodan okunur.
+    """
     parts = []
     current = element
     while current.parent and current.parent.name != "[document]":
@@ -89,35 +317,43 @@ def get_css_selector(element) -> str:
         if current.has_attr("class"):
             classes = ".".join(c for c in current["class"] if c)
             tag = f"{tag}.{classes}"
-        siblings = current.find_previous_siblings(current.name)
-        tag = f"{tag}:nth-of-type({len(siblings) + 1})"
+        if index is not None:
+            position = index.nth_of_type(current)
+        else:
+            position = len(current.find_previous_siblings(current.name)) + 1
+        tag = f"{tag}:nth-of-type({position})"
         parts.insert(0, tag)
         current = current.parent
     return " > ".join(parts)
 
 
-def _score_element(el) -> int:
+_HIDDEN_TAGS = {"head", "script", "style", "noscript"}
+_BAD_CLASS_WORDS = ("old", "original", "previous", "crossed", "before", "strike")
+
+# get_text(strip=True) ile aynı: yalnızca düz metin ve CDATA düğümleri sayılır
+_TEXT_TYPES = (NavigableString, CData)
+
+# Bundan uzun metinler aşağıdan yukarı birleştirilmez (her ata için kopya olmasın);
+# böyle bir element aday ise metni get_text ile bir kez okunur
+MAX_CANDIDATE_TEXT = 200
+
+
+def _score(tag: str, cls: str, length: int, hidden: bool) -> int:
     score = 0
-    tag = (el.name or "").lower()
 
     if tag in {"span", "strong", "b", "em"}:
         score += 3
     elif tag in {"div", "p"}:
         score += 1
 
-    for parent in el.parents:
-        if parent.name in {"head", "script", "style", "noscript"}:
-            score -= 10
-            break
+    if hidden:
+        score -= 10
 
-    cls = " ".join(el.get("class", [])).lower()
     if "price" in cls or "fiyat" in cls:
         score += 5
-    if any(bad in cls for bad in ("old", "original", "previous", "crossed", "before", "strike")):
+    if any(bad in cls for bad in _BAD_CLASS_WORDS):
         score -= 3
 
-    text = el.get_text(strip=True)
-    length = len(text)
     if 0 < length < 25:
         score += 3
     elif length < 40:
@@ -128,44 +364,283 @@ def _score_element(el) -> int:
     return score
 
 
-def _find_best_match(soup: BeautifulSoup, target_value: float):
+def _score_element(el) -> int:
+    hidden = any(parent.name in _HIDDEN_TAGS for parent in el.parents)
+    cls = " ".join(el.get("class", [])).lower()
+    return _score((el.name or "").lower(), cls, len(el.get_text(strip=True)), hidden)
+
+
+class CandidateIndex:
     """
-    Sayfada target_value'ya en yakın fiyatı taşıyan elementi bulur.
-    Tam eşleşme → öncelikli; ±%5 tolerans → kabul edilir.
-    """
-    candidate_elements = []
-
-    # 1. Önce price/fiyat class'lı elementler
-    for el in soup.find_all(True, class_=True):
-        cls = " ".join(el.get("class", [])).lower()
-        if "price" in cls or "fiyat" in cls:
-            candidate_elements.append(el)
-
-    # 2. Yoksa tüm text node parent'ları
-    if not candidate_elements:
-        for node in soup.find_all(string=True):
-            parent = node.parent
-            if parent and parent.name not in {"script", "style", "noscript"}:
-                candidate_elements.append(parent)
-
-    exact, close = [], []
-    for el in candidate_elements:
-        text = el.get_text(strip=True)
-        val = extract_price_from_text(text)
-        if val is None:
-            continue
-        if abs(val - target_value) < 0.01:
-            exact.append(el)
-        elif abs(val - target_value) / (target_value or 1) < 0.05:
-            close.append(el)
+    Sayfanın tek geçişte çıkarılmış fiyat adayı indeksi.
 
-    pool = exact if exact else close
-    if not pool:
+    Her element için metin, sayısal değer, metin uzunluğu ve
+    gizli-ata bayrağı bir kez hesaplanır; nth-of-type pozisyonları parent başına
+    bir kez sayılıp saklanır. Adaylar değere göre sıralanır; aynı soup üzerinde
+    birden fazla hedef değer (kalibrasyon, yeniden kalibrasyon) ikili arama ile
+    eşlenir.
+    """
+
+    def __init__(self, soup: BeautifulSoup):
+        self._positions: dict[int, int] = {}
+        texts: dict[int, str | None] = {}
+        hidden: dict[int, bool] = {id(soup): False}
+        has_string: set[int] = set()
+        tags = []
+
+        # Yukarıdan aşağı: gizli-ata bayrakları
+        for el in soup.descendants:
+            if not isinstance(el, Tag):
+                continue
+            tags.append(el)
+            parent = el.parent
+            hidden[id(el)] = parent.name in _HIDDEN_TAGS or hidden[id(parent)]
+
+        # Aşağıdan yukarı: kısa metinler çocuklardan birleştirilir
+        for el in reversed(tags):
+            parts = []
+            length = 0
+            for child in el.contents:
+                if isinstance(child, Tag):
+                    piece = texts[id(child)]
+                    if piece is None:
+                        length = MAX_CANDIDATE_TEXT + 1
+                        break
+                elif isinstance(child, NavigableString):
+                    has_string.add(id(el))
+                    if type(child) not in _TEXT_TYPES:
+                        continue
+                    piece = child.strip()
+                else:
+                    continue
+                length += len(piece)
+                if length > MAX_CANDIDATE_TEXT:
+                    break
+                parts.append(piece)
+            texts[id(el)] = "".join(parts) if length <= MAX_CANDIDATE_TEXT else None
+
+        # Aday seçimi: önce price/fiyat class'lılar, yoksa metin düğümü parent'ları
+        candidates = []
+        for el in tags:
+            if "class" in el.attrs:
+                cls = " ".join(el["class"]).lower()
+                if "price" in cls or "fiyat" in cls:
+                    candidates.append((el, cls))
+        if not candidates:
+            for el in tags:
+                if id(el) in has_string and el.name not in {"script", "style", "noscript"}:
+                    candidates.append((el, " ".join(el.get("class", [])).lower()))
+
+        values: dict[str, float | None] = {}
+        entries = []
+        for order, (el, cls) in enumerate(candidates):
+            text = texts[id(el)]
+            if text is None:
+                text = el.get_text(strip=True)
+            if text not in values:
+                values[text] = extract_price_from_text(text)
+            val = values[text]
+            if val is None:
+                continue
+            score = _score((el.name or "").lower(), cls, len(text), hidden[id(el)])
+            entries.append((val, score, -order, el, (el.name, cls)))
+
+        # Aynı tag + class ile tekrar eden adaylar (öneri kartları, listeler)
+        self._shapes = Counter(e[4] for e in entries)
+        entries.sort(key=lambda e: e[0])
+        self._values = [e[0] for e in entries]
+        self._entries = entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def nth_of_type(self, el) -> int:
+        """nth-of-type pozisyonu; her parent'ın çocukları ilk istekte bir kez sayılır."""
+        pos = self._positions.get(id(el))
+        if pos is None:
+            parent = el.parent
+            if parent is None:
+                return 1
+            counts: dict[str, int] = {}
+            for child in parent.contents:
+                if isinstance(child, Tag):
+                    counts[child.name] = counts.get(child.name, 0) + 1
+                    self._positions[id(child)] = counts[child.name]
+            pos = self._positions[id(el)]
+        return pos
+
+    def _range(self, low: float, high: float):
+        start = bisect_left(self._values, low)
+        end = bisect_right(self._values, high)
+        return self._entries[start:end]
+
+    def lookup(self, target_value: float, tolerance: float = 0.05):
+        """
+        Hedef değere eşleşen en iyi elementi döner (yoksa None).
+        Tam eşleşme (±0.01) öncelikli; yoksa ±tolerance (varsayılan %5) içinde
+        sayfada tekrar etmeyen (tag + class'ı tek olan) tek aday kabul edilir.
+        Öneri kartları ve liste satırları yakın eşleşme olamaz: fiyatı JS ile
+        yazılan sayfada yakın fiyatlı rastgele bir kart ürün fiyatı sanılmaz.
+        """
+        exact = [e for e in self._range(target_value - 0.01, target_value + 0.01)
+                 if abs(e[0] - target_value) < 0.01]
+        if exact or tolerance <= 0:
+            pool = exact
+        else:
+            tol = tolerance * (target_value or 1)
+            pool = [e for e in self._range(target_value - abs(tol), target_value + abs(tol))
+                    if abs(e[0] - target_value) / (target_value or 1) < tolerance]
+            pool = [e for e in pool if self._shapes[e[4]] == 1]
+            if len(pool) > 1:
+                return None
+        if not pool:
+            return None
+        # Eşit skorda belge sırasında ilk gelen (max'ın eski davranışı)
+        return max(pool, key=lambda e: (e[1], e[2]))[3]
+
+
+def _find_best_match(soup: BeautifulSoup, target_value: float,
+                     index: CandidateIndex | None = None):
+    """
+    Sayfada target_value'ya en yakın fiyatı taşıyan elementi bulur.
+    Tam eşleşme → öncelikli; ±%5 tolerans → yalnızca tekrar etmeyen tek aday.
+    """
+    if index is None:
+        index = CandidateIndex(soup)
+    best = index.lookup(target_value)
+    if best is None:
         raise RuntimeError(
             f"'{target_value}' fiyatı DOM'da bulunamadı. "
             "Sayfadaki fiyat ile girilen değer uyuşmuyor olabilir."
         )
-    return max(pool, key=_score_element)
+    return best
+
+
+# ── Seçici seti ───────────────────────────────────────────────────────────────
+
+# Kalibrasyonda saklanacak en fazla seçici sayısı
+MAX_SELECTORS = 4
+
+# Değeri sabit kalması beklenen, çapa olarak kullanılabilecek attribute'lar
+ANCHOR_ATTRS = ("itemprop", "data-testid", "data-test-id", "data-test", "data-qa", "name")
+
+# Otomatik üretilmiş görünen değerler (uzun rakam dizileri, hash'ler) çapa olamaz
+_UNSTABLE_TOKEN = re.compile(r"\d{3,}|[0-9a-f]{8,}|^(?:css|sc|jsx)-", re.IGNORECASE)
+
+
+def _is_stable_token(value) -> bool:
+    value = str(value or "")
+    return 0 < len(value) <= 64 and not _UNSTABLE_TOKEN.search(value)
+
+
+def _simple_selector(el) -> str:
+    """tag + kararlı class'lar (nth-of-type olmadan)."""
+    classes = [c for c in el.get("class", []) if c and _is_stable_token(c)]
+    return el.name + "".join(f".{sv.escape(c)}" for c in classes)
+
+
+def _selects(soup: BeautifulSoup, selector: str, element, unique: bool = True) -> bool:
+    """Seçici sayfada ilk sırada element'i (unique ise yalnızca onu) buluyor mu?"""
+    try:
+        matches = soup.select(selector, limit=2 if unique else 1)
+    except Exception:
+        return False
+    if not matches or matches[0] is not element:
+        return False
+    return not unique or len(matches) == 1
+
+
+def _anchor_selectors(element):
+    """Elementin kendi id/attribute'ı veya en yakın id'li atası üzerinden seçiciler."""
+    if element.has_attr("id") and _is_stable_token(element["id"]):
+        yield f"#{sv.escape(element['id'])}"
+    for attr in ANCHOR_ATTRS:
+        value = element.get(attr)
+        if isinstance(value, str) and _is_stable_token(value) and not re.search(r"\d", value):
+            yield f'{element.name}[{attr}="{value}"]'
+    for parent in element.parents:
+        if parent.name == "[document]":
+            break
+        if parent.has_attr("id") and _is_stable_token(parent["id"]):
+            yield f"#{sv.escape(parent['id'])} {_simple_selector(element)}"
+            break
+
+
+def _shortest_unique_path(soup: BeautifulSoup, element) -> str | None:
+    """nth-of-type kullanmadan, yukarı doğru büyüyen en kısa benzersiz yol."""
+    parts = []
+    current = element
+    while current is not None and current.name != "[document]":
+        parts.insert(0, _simple_selector(current))
+        selector = " > ".join(parts)
+        if _selects(soup, selector, element):
+            return selector
+        current = current.parent
+    return None
+
+
+def _text_anchor_selectors(element):
+    """Yakınındaki sabit etiket metnine ('Fiyat:', 'Sepette' vb.) dayanan seçiciler."""
+    for target in (element, element.parent):
+        if target is None or target.name == "[document]":
+            continue
+        for label in target.find_previous_siblings(limit=3):
+            if not isinstance(label, Tag):
+                continue
+            text = label.get_text(" ", strip=True)
+            if not text or len(text) > 30 or re.search(r"\d", text) or '"' in text:
+                continue
+            anchor = f'{_simple_selector(label)}:-soup-contains("{text}") ~ {_simple_selector(target)}'
+            if target is element:
+                yield anchor
+            else:
+                yield f"{anchor} > {_simple_selector(element)}"
+            break
+
+
+def build_selector_set(soup: BeautifulSoup, element, index: CandidateIndex | None = None,
+                       limit: int = MAX_SELECTORS) -> list[str]:
+    """
+    Element için sıralı seçici listesi üretir ve sayfada doğrular:
+      1. id / kararlı attribute çapaları
+      2. nth-of-type'sız en kısa benzersiz yol
+      3. metin çapalı varyantlar
+      4. tam nth-of-type yolu (get_css_selector, her zaman son çare)
+    """
+    expected = extract_price_from_text(element.get_text(strip=True))
+    ranked = []
+
+    def consider(selector):
+        if not selector or selector in ranked or len(ranked) >= limit - 1:
+            return
+        if not _selects(soup, selector, element):
+            return
+        found = soup.select_one(selector)
+        if extract_price_from_text(found.get_text(strip=True)) != expected:
+            return
+        ranked.append(selector)
+
+    for selector in _anchor_selectors(element):
+        consider(selector)
+    consider(_shortest_unique_path(soup, element))
+    for selector in _text_anchor_selectors(element):
+        consider(selector)
+
+    full_path = get_css_selector(element, index)
+    if full_path not in ranked:
+        ranked.append(full_path)
+    return ranked
+
+
+def _selectors_for_value(html: str, value: float) -> list[str]:
+    """Sayfada value'yu taşıyan elementin seçici seti; ağaç iş bitince serbest bırakılır."""
+    soup = BeautifulSoup(html, "html.parser")
+    try:
+        index = CandidateIndex(soup)
+        best = _find_best_match(soup, value, index)
+        return build_selector_set(soup, best, index)
+    finally:
+        soup.decompose()
 
 
 def calibrate_and_add_product(user_id: str, url: str, price_text: str,
@@ -183,21 +658,20 @@ def calibrate_and_add_product(user_id: str, url: str, price_text: str,
     if initial_value is None:
         raise ValueError("Girilen metinden fiyat çıkarılamadı.")
 
-    html = fetch_html(url)
-    soup = BeautifulSoup(html, "html.parser")
-
-    best = _find_best_match(soup, initial_value)
-    selector = get_css_selector(best)
+    selectors = _selectors_for_value(fetch_html(url), initial_value)
+    selector = selectors[0]
 
     if isinstance(target_price, str):
         target_price = float(target_price.replace(",", "."))
 
-    database.add_product(user_id, url, target_price, initial_value, selector, name=name)
+    database.add_product(user_id, url, target_price, initial_value, selector, name=name,
+                         selectors=selectors)
 
     return {
         "url": url,
         "name": name,
         "selector": selector,
+        "selectors": selectors,
         "initial_price": initial_value,
         "target_price": target_price,
     }
@@ -216,21 +690,29 @@ def recalibrate_product(product_id: int, user_id: str, current_price_text: str)
     if current_value is None:
         raise ValueError("Girilen metinden fiyat çıkarılamadı.")
 
-    html = fetch_html(product["url"])
-    soup = BeautifulSoup(html, "html.parser")
+    selectors = _selectors_for_value(fetch_html(product["url"]), current_value)
+    new_selector = selectors[0]
 
-    best = _find_best_match(soup, current_value)
-    new_selector = get_css_selector(best)
-
-    database.update_product_selector(product_id, new_selector)
+    database.update_product_selector(product_id, new_selector, selectors)
 
     return {
         "product_id": product_id,
         "new_selector": new_selector,
+        "new_selectors": selectors,
         "detected_price": current_value,
     }
 
 
+def calibrate_existing_product(product) -> list[str]:
+    """
+    Seçicisi olmayan (toplu içe aktarılmış) ürünü worker'da kalibre eder.
+    Sayfada initial_price değeri aranır; bulunamazsa RuntimeError.
+    """
+    selectors = _selectors_for_value(fetch_html(product["url"]), product["initial_price"])
+    database.update_product_selector(product["id"], selectors[0], selectors)
+    return selectors
+
+
 def main():
     database.setup_database()
     url = input("Takip edilecek ürün URL: ").strip()
@@ -0,0 +1,198 @@
+"""
+events.py — Kullanıcı bazlı canlı fiyat olayı akışı (Server-Sent Events).
+
+Fiyat kontrolcüsü değişiklikleri price_events tablosuna yazar ve aynı süreçteki
+abonelere anında iletir. Her bağlantının sınırlı bir tamponu vardır; tampon
+dolarsa (yavaş istemci) olaylar düşürülmez, akış veritabanından kaldığı yerden
+devam eder. Başka süreçlerin (ör. ayrı worker) yazdığı olaylar heartbeat
+aralığında veritabanından toplanır. Gönderim sırası her zaman veritabanındaki
+id sırasıdır; bellek içi kuyruk yalnızca bekleyen bağlantıyı uyandırır.
+"""
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+import database
+
+# Bağlantı başına bellek içi tampon boyutu
+STREAM_BUFFER_SIZE = 100
+
+# Olay gelmezse keepalive + veritabanı taraması aralığı (saniye)
+STREAM_HEARTBEAT_SECONDS = 15.0
+
+# Olay tipleri
+PRICE_CHANGE = "price_change"
+ALERT = "alert"
+
+
+class Subscription:
+    """Tek bir SSE bağlantısının sınırlı tamponu."""
+
+    def __init__(self, user_id: str, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, event: dict):
+        # Yalnızca event loop thread'inde çağrılır
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def drain(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+
+class EventBroker:
+    """Süreç içi yayıncı: publish() herhangi bir thread'den çağrılabilir."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: dict[str, set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, user_id: str, maxsize: int = STREAM_BUFFER_SIZE) -> Subscription:
+        sub = Subscription(user_id, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subs[user_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subs.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.user_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+    def publish(self, event: dict):
+        with self._lock:
+            subs = list(self._subs.get(event["user_id"], ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                # Loop kapanmış; bağlantı zaten sonlanıyor
+                pass
+
+
+broker = EventBroker()
+
+
+def emit(user_id: str, product_id: int, event_type: str, data: dict) -> dict:
+    """Olayı kalıcı olarak kaydeder ve canlı abonelere iletir."""
+    event_id = database.add_price_event(user_id, product_id, event_type, data)
+    event = {
+        "id": event_id,
+        "user_id": user_id,
+        "product_id": product_id,
+        "event_type": event_type,
+        "data": data,
+    }
+    broker.publish(event)
+    return event
+
+
+def emit_check_events(product, price: float, source: str) -> bool:
+    """
+    Kontrol sonucundan price_change / alert olaylarını üretir.
+    Returns: alarm tetiklendiyse True
+    """
+    pid = product["id"]
+    user_id = product["user_id"]
+    old_price = product["current_price"]
+
+    if old_price is None or abs(old_price - price) >= 0.01:
+        emit(user_id, pid, PRICE_CHANGE, {
+            "product_id": pid,
+            "old_price": old_price,
+            "new_price": price,
+            "source": source,
+        })
+
+    alert_triggered = (
+        product["alert_enabled"] == 1
+        and product["alert_price"] is not None
+        and price <= product["alert_price"]
+    )
+    if alert_triggered:
+        emit(user_id, pid, ALERT, {
+            "product_id": pid,
+            "price": price,
+            "alert_price": product["alert_price"],
+        })
+    return alert_triggered
+
+
+def _format_sse(event_id: int, event_type: str, data: dict) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+async def _replay(user_id: str, after_id: int):
+    """after_id'den sonraki kalıcı olayları (id, sse_metni) olarak döner."""
+    while True:
+        # Sorgu event loop'u bloklamasın
+        rows = await asyncio.to_thread(database.get_price_events, user_id, after_id)
+        if not rows:
+            return
+        for row in rows:
+            after_id = row["id"]
+            yield after_id, _format_sse(after_id, row["event_type"], json.loads(row["payload"]))
+
+
+async def stream(user_id: str, last_event_id: int | None = None,
+                 buffer_size: int = STREAM_BUFFER_SIZE,
+                 heartbeat: float = STREAM_HEARTBEAT_SECONDS):
+    """
+    SSE metin parçaları üreten async generator.
+    last_event_id verilirse o id'den sonraki olaylar önce veritabanından gönderilir.
+    """
+    sub = broker.subscribe(user_id, buffer_size)
+    try:
+        # Abonelikten sonra okunur; aradaki olaylar kuyruğa düşer, id ile ayıklanır
+        if last_event_id is None:
+            last = await asyncio.to_thread(database.get_last_event_id, user_id)
+        else:
+            last = last_event_id
+            async for last, chunk in _replay(user_id, last):
+                yield chunk
+
+        yield f"retry: {int(heartbeat * 1000)}\n\n"
+
+        while True:
+            if sub.overflowed:
+                # Yavaş istemci: tamponu at, kaldığı yerden veritabanından devam et
+                sub.drain()
+                async for last, chunk in _replay(user_id, last):
+                    yield chunk
+                continue
+
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                sent = False
+                async for last, chunk in _replay(user_id, last):
+                    sent = True
+                    yield chunk
+                if not sent:
+                    yield ": keepalive\n\n"
+                continue
+
+            if event["id"] <= last:
+                continue
+            # Veritabanı sırası esas alınır: başka süreçlerin araya giren olayları da
+            # id sırasıyla gönderilir. Kuyrukta kalan eski bildirimler atlanır.
+            async for last, chunk in _replay(user_id, last):
+                yield chunk
+    finally:
+        broker.unsubscribe(sub)
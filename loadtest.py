@@ -0,0 +1,615 @@
+"""
+loadtest.py — API + fiyat kontrolcüsü için uçtan uca yük testi (çevrimdışı).
+
+Kendi sürecinde sahte mağazayı (mockshop.py) başlatır, API'yi geçici bir
+veritabanıyla uvicorn alt sürecinde açar ve senaryoları çalıştırır. Ürünler
+önce POST /products ile kalibre edilerek eklenir; her turda mağaza fiyatların
+bir kısmını değiştirir ve bulunan fiyat mağazadaki gerçek fiyatla karşılaştırılır.
+
+Senaryolar:
+    check      POST /products/{id}/check, --concurrency eşzamanlı istemci
+    check-all  POST /check-all (tek istek, sıralı kontrol)
+    loop       tracker.run_loop turu (check_prices) ayrı süreçte
+    mixed      check + loop aynı anda (çapraz süreç yazma çekişmesi)
+Tüm senaryolar sırasında --readers okuyucu GET /products ve geçmiş çeker.
+
+Rapor: dakikada kontrol edilen ürün, rota başına p50/p99 gecikme, API ve loop
+süreçlerinin bellek zirvesi (RSS), veritabanı çekişmesi (SQLite: yazma kilidi
+bekleme süresi; PostgreSQL: bekleyen kilitler) ve biçime göre yanlış/başarısız
+fiyatlar.
+
+    python loadtest.py
+    python loadtest.py --preset ci --json loadtest.json    # CI: küçük ve hızlı
+    python loadtest.py --scenarios check mixed --products 300 --page-kb 64,1024 --concurrency 16
+    python loadtest.py --database-url postgresql://...     # boş bir test veritabanı!
+
+Playwright varsayılan olarak kapalıdır (BROWSER_FETCH=0); JS ile yazılan fiyatları
+tarayıcıyla ölçmek için --browser (Chromium kurulu olmalı).
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import mockshop
+
+USER_ID = "loadtest"
+
+PRESETS = {
+    # CI: birkaç saniyede biter; yanlış fiyat çıkarsa çıkış kodu 1. 512 KB sayfalar
+    # SLICE_MIN_BYTES'ı aşar (dilim yolu), *_list biçimlerinde yapısal veri görünür
+    # fiyattan farklıdır; JS fiyatlı ürünler tarayıcısız başarısız olabilir, yanlış olamaz
+    "ci": {"products": 24, "page_kb": (16, 128, 512),
+           "formats": (*mockshop.DEFAULT_FORMATS, "jsonld_list", "meta_list"),
+           "js_ratio": 0.1, "rounds": 2, "concurrency": 4, "readers": 2,
+           "latency_ms": 5.0, "fail_on_wrong": True},
+    "large-pages": {"products": 40, "page_kb": (512, 2048, 6144), "rounds": 2,
+                    "concurrency": 4},
+    "flaky": {"products": 60, "latency_ms": 300.0, "error_rate": 0.1, "js_ratio": 0.2,
+              "concurrency": 16},
+}
+
+# tracker.run_loop'un gövdesi (check_prices); turlar arasındaki uyku yerine
+# stdin'den gelen satırı bekler. Her ürünün sonucu JSON satırı olarak döner.
+_LOOP_RUNNER = """
+import contextlib, io, json, sys, time
+import database, tracker
+
+results = {}
+check_product = tracker.check_product
+
+def recorded(product, trace=False):
+    try:
+        result = check_product(product, trace)
+    except Exception as exc:
+        results[product["id"]] = {"error": str(exc)}
+        raise
+    results[product["id"]] = {"price": result["price"]}
+    return result
+
+tracker.check_product = recorded
+with contextlib.redirect_stdout(io.StringIO()):
+    database.setup_database()
+print(json.dumps({"ready": True}), flush=True)
+for _ in sys.stdin:
+    results.clear()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.check_prices()
+    print(json.dumps({"seconds": time.perf_counter() - start, "results": results}), flush=True)
+"""
+
+
+# ── Ölçüm ─────────────────────────────────────────────────────────────────────
+
+def percentile(values: list[float], q: float) -> float:
+    """Sıralı listede en yakın sıra yöntemiyle yüzdelik."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+class Recorder:
+    """Rota başına istek süreleri ve durum kodları (thread güvenli)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.db_errors = 0
+
+    def record(self, route: str, seconds: float, status: int, detail: str = ""):
+        with self._lock:
+            self.samples[route].append(seconds)
+            self.statuses[route][status] += 1
+            if status >= 500 and ("locked" in detail or "deadlock" in detail):
+                self.db_errors += 1
+
+    def summary(self) -> dict:
+        out = {}
+        for route, values in self.samples.items():
+            ordered = sorted(values)
+            statuses = self.statuses[route]
+            out[route] = {
+                "n": len(ordered),
+                "p50_ms": percentile(ordered, 0.50) * 1000,
+                "p99_ms": percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+                "errors": sum(n for status, n in statuses.items() if status >= 400 or status == 0),
+            }
+        return out
+
+
+def _rss_mb(pid: int) -> float | None:
+    """Sürecin anlık RSS'i (Linux /proc; başka platformda None)."""
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class Sampler(threading.Thread):
+    """
+    Senaryo boyunca süreç belleğini ve veritabanı çekişmesini örnekler.
+    SQLite: yazma kilidini (BEGIN IMMEDIATE) alma süresi.
+    PostgreSQL: pg_locks'ta bekleyen (granted = false) kilit sayısı.
+    """
+
+    def __init__(self, pids: dict[str, int], interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.pids = pids
+        self.interval = interval
+        self.rss: dict[str, float] = {}
+        self.waits: list[float] = []
+        self.lock_waits: list[int] = []
+        self.timeouts = 0
+        self._done = threading.Event()
+
+    def run(self):
+        import database
+
+        backend = database.get_backend()
+        conn = database.get_db_connection(check_same_thread=False)
+        try:
+            while not self._done.wait(self.interval):
+                for name, pid in self.pids.items():
+                    rss = _rss_mb(pid)
+                    if rss is not None:
+                        self.rss[name] = max(self.rss.get(name, 0.0), rss)
+                self._probe(backend, conn)
+        finally:
+            conn.close()
+
+    def _probe(self, backend, conn):
+        if backend.name == "postgresql":
+            row = conn.execute("SELECT count(*) AS n FROM pg_locks WHERE NOT granted").fetchone()
+            conn.rollback()
+            self.lock_waits.append(int(row["n"]))
+            return
+        start = time.perf_counter()
+        try:
+            backend.begin_write(conn)
+        except Exception:
+            # busy_timeout doldu: yazarlar kilidi bu süreden uzun tuttu
+            self.timeouts += 1
+            return
+        self.waits.append(time.perf_counter() - start)
+        conn.rollback()
+
+    def stop(self) -> dict:
+        self._done.set()
+        self.join()
+        db = {}
+        if self.waits:
+            ordered = sorted(self.waits)
+            db = {"write_wait_p50_ms": percentile(ordered, 0.50) * 1000,
+                  "write_wait_p99_ms": percentile(ordered, 0.99) * 1000,
+                  "write_wait_max_ms": ordered[-1] * 1000,
+                  "write_timeouts": self.timeouts}
+        elif self.lock_waits:
+            db = {"lock_waits_max": max(self.lock_waits),
+                  "lock_waits_mean": sum(self.lock_waits) / len(self.lock_waits)}
+        return {"rss_mb": self.rss, "db": db}
+
+
+# ── Süreçler ──────────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ApiClient:
+    """API istemcisi; thread başına bir requests.Session."""
+
+    def __init__(self, base_url: str, recorder: Recorder):
+        self.base_url = base_url
+        self.recorder = recorder
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, route: str, timeout: float | None = 120,
+                **kwargs) -> tuple[int, dict | list | None]:
+        import requests
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["X-User-Id"] = USER_ID
+        start = time.perf_counter()
+        try:
+            resp = session.request(method, self.base_url + path, timeout=timeout, **kwargs)
+        except requests.RequestException as exc:
+            self.recorder.record(route, time.perf_counter() - start, 0, str(exc))
+            return 0, None
+        seconds = time.perf_counter() - start
+        try:
+            data = resp.json()
+        except ValueError:
+            data = None
+        detail = str(data.get("detail", "")) if isinstance(data, dict) else ""
+        self.recorder.record(route, seconds, resp.status_code, detail)
+        return resp.status_code, data
+
+
+def start_api(env: dict, cwd: str) -> tuple[subprocess.Popen, str]:
+    """uvicorn alt süreci; /health yanıt verene kadar bekler."""
+    import requests
+
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", "1", "--log-level", "warning"],
+        env=env, cwd=cwd, stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API süreci açılamadı (çıkış kodu {proc.returncode})")
+        with contextlib.suppress(requests.RequestException):
+            if requests.get(base_url + "/health", timeout=1).ok:
+                return proc, base_url
+        time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("API 60 sn içinde /health yanıtı vermedi")
+
+
+class LoopRunner:
+    """_LOOP_RUNNER alt süreci: her round() bir check_prices turu çalıştırır."""
+
+    def __init__(self, env: dict, cwd: str):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-c", _LOOP_RUNNER], env=env, cwd=cwd, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        self._read()
+
+    def _read(self) -> dict:
+        line = self.proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"loop süreci beklenmedik şekilde kapandı ({self.proc.poll()})")
+        return json.loads(line)
+
+    def round(self) -> dict:
+        self.proc.stdin.write("\n")
+        self.proc.stdin.flush()
+        result = self._read()
+        result["results"] = {int(pid): item for pid, item in result["results"].items()}
+        return result
+
+    def close(self):
+        with contextlib.suppress(OSError):
+            self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+# ── Senaryolar ────────────────────────────────────────────────────────────────
+
+class Run:
+    """Senaryoların paylaştığı durum: mağaza, API, eklenen ürünler, sonuç sayaçları."""
+
+    def __init__(self, args, shop: mockshop.MockShop, env: dict, cwd: str):
+        self.args = args
+        self.shop = shop
+        self.env = env
+        self.cwd = cwd
+        self.api_proc = None
+        self.client: ApiClient | None = None
+        self.loop: LoopRunner | None = None
+        self.products: dict[int, int] = {}   # ürün id → mağaza indeksi
+        self.outcomes: Counter = Counter()
+        self.issues: dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def loop_runner(self) -> LoopRunner:
+        if self.loop is None:
+            self.loop = LoopRunner(self.env, self.cwd)
+        return self.loop
+
+    def pids(self) -> dict[str, int]:
+        pids = {"api": self.api_proc.pid}
+        if self.loop is not None:
+            pids["loop"] = self.loop.proc.pid
+        return pids
+
+    def tally(self, index: int, price) -> str:
+        """Bulunan fiyatı mağazadaki gerçek fiyatla karşılaştırır."""
+        if price is None:
+            outcome = "failed"
+        elif abs(price - self.shop.price(index)) < 0.005:
+            outcome = "ok"
+        else:
+            outcome = "wrong"
+        product = self.shop.products[index]
+        with self._lock:
+            self.outcomes[outcome] += 1
+            if outcome != "ok":
+                self.issues[product["format"] + ("+js" if product["js"] else "")][outcome] += 1
+        return outcome
+
+
+def scenario_add(run: Run) -> int:
+    """Tüm ürünleri POST /products ile kalibre ederek ekler (5xx'te 3 deneme)."""
+    def add(index: int) -> bool:
+        body = {"url": run.shop.url(index), "price_text": run.shop.price_text(index),
+                "target_price": round(run.shop.price(index) * 0.5, 2),
+                "name": run.shop.products[index]["name"]}
+        for _ in range(3):
+            status, _ = run.client.request("POST", "/products", "POST /products", json=body)
+            if status == 201:
+                return True
+            if 0 < status < 500:
+                return False
+        return False
+
+    with ThreadPoolExecutor(run.args.concurrency) as pool:
+        added = list(pool.map(add, range(len(run.shop.products))))
+    run.outcomes.update(ok=sum(added), failed=added.count(False))
+
+    _, rows = run.client.request("GET", "/products", "GET /products")
+    index_by_url = {run.shop.url(i): i for i in range(len(run.shop.products))}
+    run.products = {row["id"]: index_by_url[row["url"]] for row in rows or []
+                    if row["url"] in index_by_url}
+    return len(added)
+
+
+def _api_checks(run: Run) -> int:
+    def check(item):
+        pid, index = item
+        status, data = run.client.request("POST", f"/products/{pid}/check",
+                                          "POST /products/{id}/check")
+        run.tally(index, data["current_price"] if status == 200 else None)
+
+    with ThreadPoolExecutor(run.args.concurrency) as pool:
+        list(pool.map(check, run.products.items()))
+    return len(run.products)
+
+
+def _loop_round(run: Run) -> int:
+    result = run.loop_runner().round()
+    for pid, index in run.products.items():
+        run.tally(index, result["results"].get(pid, {}).get("price"))
+    return len(run.products)
+
+
+def scenario_check(run: Run) -> int:
+    checks = 0
+    for _ in range(run.args.rounds):
+        run.shop.tick()
+        checks += _api_checks(run)
+    return checks
+
+
+def scenario_check_all(run: Run) -> int:
+    checks = 0
+    for _ in range(run.args.rounds):
+        run.shop.tick()
+        status, data = run.client.request("POST", "/check-all", "POST /check-all", timeout=None)
+        items = {item["id"]: item for item in (data or {}).get("results", [])} \
+            if status == 200 else {}
+        for pid, index in run.products.items():
+            run.tally(index, items.get(pid, {}).get("current_price"))
+        checks += len(run.products)
+    return checks
+
+
+def scenario_loop(run: Run) -> int:
+    run.loop_runner()
+    checks = 0
+    for _ in range(run.args.rounds):
+        run.shop.tick()
+        checks += _loop_round(run)
+    return checks
+
+
+def scenario_mixed(run: Run) -> int:
+    run.loop_runner()
+    checks = 0
+    with ThreadPoolExecutor(2) as pool:
+        for _ in range(run.args.rounds):
+            run.shop.tick()
+            api = pool.submit(_api_checks, run)
+            loop = pool.submit(_loop_round, run)
+            checks += api.result() + loop.result()
+    return checks
+
+
+SCENARIOS = {
+    "check": scenario_check,
+    "check-all": scenario_check_all,
+    "loop": scenario_loop,
+    "mixed": scenario_mixed,
+}
+
+
+def _reader(run: Run, stop: threading.Event, offset: int):
+    ids = list(run.products) or [0]
+    i = offset
+    while not stop.is_set():
+        pid = ids[i % len(ids)]
+        run.client.request("GET", "/products", "GET /products")
+        run.client.request("GET", f"/products/{pid}/history?limit=60", "GET /products/{id}/history")
+        i += 1
+
+
+def run_scenario(run: Run, name: str) -> dict:
+    run.client.recorder = Recorder()
+    run.outcomes = Counter()
+    run.issues = defaultdict(Counter)
+    if name in ("loop", "mixed"):
+        run.loop_runner()
+    sampler = Sampler(run.pids())
+    sampler.start()
+    stop = threading.Event()
+    readers = [] if name == "add" else [
+        threading.Thread(target=_reader, args=(run, stop, i), daemon=True)
+        for i in range(run.args.readers)
+    ]
+    for thread in readers:
+        thread.start()
+
+    start = time.perf_counter()
+    try:
+        checks = scenario_add(run) if name == "add" else SCENARIOS[name](run)
+    finally:
+        seconds = time.perf_counter() - start
+        stop.set()
+        for thread in readers:
+            thread.join()
+        sampled = sampler.stop()
+
+    return {
+        "name": name,
+        "checks": checks,
+        "seconds": seconds,
+        "per_minute": checks / seconds * 60 if seconds else 0.0,
+        "outcomes": dict(run.outcomes),
+        "issues": {key: dict(counts) for key, counts in run.issues.items()},
+        "latency": run.client.recorder.summary(),
+        "db_errors": run.client.recorder.db_errors,
+        **sampled,
+    }
+
+
+# ── Rapor ─────────────────────────────────────────────────────────────────────
+
+def print_result(result: dict):
+    out = result["outcomes"]
+    print(f"\n{result['name']:<10} {result['checks']:>6} kontrol  "
+          f"{result['per_minute']:8.1f} ürün/dk  {result['seconds']:6.1f} sn  "
+          f"doğru {out.get('ok', 0)}  yanlış {out.get('wrong', 0)}  "
+          f"başarısız {out.get('failed', 0)}")
+    for route, lat in sorted(result["latency"].items()):
+        print(f"  {route:<30} n={lat['n']:<6} p50 {lat['p50_ms']:8.1f} ms  "
+              f"p99 {lat['p99_ms']:8.1f} ms  en çok {lat['max_ms']:8.1f} ms  "
+              f"hata {lat['errors']}")
+    memory = ", ".join(f"{name} {mb:.0f} MB" for name, mb in result["rss_mb"].items()) or "-"
+    db = result["db"]
+    if "write_wait_p99_ms" in db:
+        contention = (f"yazma kilidi bekleme p50 {db['write_wait_p50_ms']:.1f} ms, "
+                      f"p99 {db['write_wait_p99_ms']:.1f} ms, en çok "
+                      f"{db['write_wait_max_ms']:.1f} ms, zaman aşımı {db['write_timeouts']}")
+    elif db:
+        contention = (f"bekleyen kilit en çok {db['lock_waits_max']}, "
+                      f"ortalama {db['lock_waits_mean']:.2f}")
+    else:
+        contention = "-"
+    print(f"  bellek zirvesi: {memory}")
+    print(f"  veritabanı: {contention}; kilit hatası {result['db_errors']}")
+    if result["issues"]:
+        labels = {"wrong": "yanlış", "failed": "başarısız"}
+        issues = "; ".join(f"{key}: " + ", ".join(f"{labels[k]} {v}" for k, v in sorted(counts.items()))
+                           for key, counts in sorted(result["issues"].items()))
+        print(f"  sorunlu biçimler: {issues}")
+
+
+def check_budgets(results: list[dict], args) -> list[str]:
+    failures = []
+    for result in results:
+        name = result["name"]
+        if name != "add" and args.min_per_minute and result["per_minute"] < args.min_per_minute:
+            failures.append(f"{name}: {result['per_minute']:.1f} ürün/dk < {args.min_per_minute}")
+        if args.fail_on_wrong and result["outcomes"].get("wrong"):
+            failures.append(f"{name}: {result['outcomes']['wrong']} yanlış fiyat")
+        for route, lat in result["latency"].items():
+            if args.max_read_p99_ms and route.startswith("GET") \
+                    and lat["p99_ms"] > args.max_read_p99_ms:
+                failures.append(f"{name}: {route} p99 {lat['p99_ms']:.0f} ms "
+                                f"> {args.max_read_p99_ms} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API + kontrolcü yük testi (sahte mağaza ile)")
+    parser.add_argument("--preset", choices=list(PRESETS))
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS),
+                        choices=list(SCENARIOS))
+    parser.add_argument("--rounds", type=int, default=3, help="senaryo başına kontrol turu")
+    parser.add_argument("--concurrency", type=int, default=8, help="eşzamanlı API istemcisi")
+    parser.add_argument("--readers", type=int, default=2,
+                        help="senaryo boyunca GET isteği atan okuyucu sayısı")
+    parser.add_argument("--browser", action="store_true",
+                        help="Playwright katmanını aç (BROWSER_FETCH=1; Chromium gerekir)")
+    parser.add_argument("--database-url", default="",
+                        help="PostgreSQL test veritabanı (varsayılan: geçici SQLite)")
+    parser.add_argument("--json", help="sonuçları bu dosyaya yaz")
+    budget = parser.add_argument_group("bütçeler (aşılırsa çıkış kodu 1)")
+    budget.add_argument("--min-per-minute", type=float, default=0)
+    budget.add_argument("--max-read-p99-ms", type=float, default=0)
+    budget.add_argument("--fail-on-wrong", action="store_true")
+    mockshop.add_arguments(parser)
+
+    preset = parser.parse_known_args()[0].preset
+    if preset:
+        parser.set_defaults(**PRESETS[preset])
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    shop = mockshop.from_args(args)
+    shop.start()
+    with tempfile.TemporaryDirectory(prefix="tagtrack-load-") as tmp:
+        # Alt süreçler ve Sampler aynı veritabanını görür; ortamdaki DATABASE_URL
+        # kullanılmaz (check-all gerçek ürünlere istek atmasın)
+        os.environ.update(DB_PATH=os.path.join(tmp, "load.db"),
+                          DATABASE_URL=args.database_url)
+        env = {**os.environ, "PYTHONPATH": here,
+               "SNAPSHOT_DIR": os.path.join(tmp, "snapshots"),
+               "BROWSER_FETCH": "1" if args.browser else "0",
+               "CHECK_PROFILING": "0"}
+        run = Run(args, shop, env, here)
+        results = []
+        try:
+            run.api_proc, base_url = start_api(env, here)
+            run.client = ApiClient(base_url, Recorder())
+            print(f"Sahte mağaza {shop.base_url}: {len(shop.products)} ürün, "
+                  f"sayfa {','.join(map(str, args.page_kb))} KB; API {base_url}")
+            for name in ["add", *args.scenarios]:
+                result = run_scenario(run, name)
+                results.append(result)
+                print_result(result)
+                if name == "add" and not run.products:
+                    print("Hiç ürün eklenemedi; senaryolar atlandı.")
+                    break
+        finally:
+            if run.loop is not None:
+                run.loop.close()
+            if run.api_proc is not None:
+                run.api_proc.terminate()
+                run.api_proc.wait(timeout=10)
+            shop.stop()
+
+    print(f"\nMağaza: {shop.stats['requests']} istek, {shop.stats['errors']} hata, "
+          f"{shop.stats['bytes'] / 1048576:.1f} MB gönderildi")
+    if args.json:
+        config = {k: list(v) if isinstance(v, tuple) else v for k, v in vars(args).items()
+                  if k != "database_url"}
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"config": config, "shop": shop.stats, "scenarios": results}, fh,
+                      ensure_ascii=False, indent=2)
+    failures = check_budgets(results, args)
+    for failure in failures:
+        print(f"BÜTÇE AŞILDI — {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+metrics.py — Süreç içi ölçümler ve Prometheus metin formatında dışa aktarım.
+
+Sayaç, gösterge ve histogramlar süreç başınadır. API süreci /metrics üzerinden,
+worker süreçleri ise WORKER_METRICS_PORT ayarlıysa kendi küçük HTTP
+sunucularından yayınlar (her worker port + sıra numarası).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Saniye cinsinden varsayılan histogram kovaları (ms'den dakikaya)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+# 16 KB … 128 MB
+BYTES_BUCKETS = tuple(float(16384 * 4 ** i) for i in range(8))
+
+_registry: list = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """Anlık değer. callback verilirse değer her okumada ondan alınır."""
+
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list[str]:
+        if self._callback is not None:
+            try:
+                values = self._callback()
+            except Exception:
+                values = {}
+            # callback ya tek sayı ya da {etiket_değeri: sayı} döner
+            if not isinstance(values, dict):
+                values = {(): values}
+            items = sorted(
+                ((k if isinstance(k, tuple) else (k,)), v) for k, v in values.items()
+            )
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # etiket → [kova sayaçları..., toplam, adet]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self._header()
+        for key, state in items:
+            for i, bound in enumerate(self.buckets):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {state[i]}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+def render() -> str:
+    """Kayıtlı tüm metrikleri Prometheus metin formatında döner."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def domain_of(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+# ── Sıcak yol metrikleri ──────────────────────────────────────────────────────
+
+FETCH_SECONDS = Histogram(
+    "tagtrack_fetch_seconds", "Sayfa çekme süresi (katmana göre)", ("tier",))
+FETCH_ERRORS = Counter(
+    "tagtrack_fetch_errors_total", "Başarısız sayfa çekme denemeleri", ("tier",))
+WAIT_PRICE = Counter(
+    "tagtrack_wait_price_total",
+    "Render sırasında fiyat bekleme sonucu (ready / timeout / invalid_selector / error)",
+    ("outcome",))
+PARSE_SECONDS = Histogram(
+    "tagtrack_parse_seconds", "HTML ayrıştırma (BeautifulSoup) süresi")
+STRATEGY_SECONDS = Histogram(
+    "tagtrack_strategy_seconds", "Fiyat stratejisi (_try_*) süresi", ("strategy",))
+STRATEGY_HITS = Counter(
+    "tagtrack_strategy_hits_total", "Fiyat bulan strateji sayısı", ("strategy",))
+PICK_BEST_SECONDS = Histogram(
+    "tagtrack_pick_best_seconds", "_pick_best süresi")
+DB_WRITE_SECONDS = Histogram(
+    "tagtrack_db_write_seconds", "Kontrol sonucunun veritabanına yazılma süresi")
+CHECK_SECONDS = Histogram(
+    "tagtrack_check_seconds", "Tek ürün kontrolünün toplam süresi")
+CHECKS = Counter(
+    "tagtrack_checks_total", "Ürün kontrolleri (alan adı ve sonuca göre)", ("domain", "outcome"))
+STALE_SELECTORS = Counter(
+    "tagtrack_stale_selector_checks_total",
+    "Seçici seti stale olduğu için atlanan kontroller", ("domain",))
+SELECTOR_MISSES = Counter(
+    "tagtrack_selector_misses_total",
+    "Seçici seti denenip fiyat vermeyen kontroller", ("domain",))
+RECALIBRATIONS = Counter(
+    "tagtrack_auto_recalibrations_total", "Otomatik yeniden kalibrasyonlar", ("domain", "outcome"))
+PAGE_BYTES = Histogram(
+    "tagtrack_page_bytes", "Çekilen HTML ve ağaca dönüştürülen kısmı (karakter)", ("kind",),
+    buckets=BYTES_BUCKETS)
+PAGE_SLICES = Counter(
+    "tagtrack_page_slices_total", "Büyük sayfalarda dilim kullanımı (used / fallback)", ("outcome",))
+PAGES_TRUNCATED = Counter(
+    "tagtrack_pages_truncated_total", "MAX_HTML_BYTES ile kesilen sayfalar")
+PAGE_MEMORY_BYTES = Histogram(
+    "tagtrack_page_memory_bytes", "Sayfa başına ayrıştırma + çıkarım bellek zirvesi "
+    "(PAGE_MEMORY_TRACE=1)", buckets=BYTES_BUCKETS)
+ANOMALIES = Counter(
+    "tagtrack_price_anomalies_total", "Karantinaya alınan / doğrulanan şüpheli fiyatlar", ("outcome",))
+BROWSERS_ACTIVE = Gauge(
+    "tagtrack_browsers_active", "Şu an açık Playwright tarayıcı sayısı")
+BROWSERS_MAX = Gauge(
+    "tagtrack_browsers_max", "Süreç başına izin verilen eşzamanlı tarayıcı sayısı")
+
+
+# ── Worker süreçleri için dışa aktarım ────────────────────────────────────────
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """/metrics'i arka plan thread'inde yayınlar (API dışındaki süreçler için)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,299 @@
+"""
+mockshop.py — Yük testi için yerel sahte e-ticaret sitesi (ağ erişimi yok).
+
+Ürün sayfaları tohumdan (seed) deterministik üretilir: sayfa boyutu, fiyat
+biçimi, fiyatın statik mi JS ile mi yazıldığı ürün başına seçilir. Sayfalarda
+gerçek sitelerdeki gibi öneri kartları, üstü çizili eski fiyatlar ve açıklama
+metinleri bulunur. Yanıtlar yapay gecikme ve hata oranıyla sunulur; tick()
+fiyatların bir kısmını değiştirir (geçmiş ve olay yazımını tetiklemek için).
+
+    python mockshop.py --port 8100 --products 20 --page-kb 16,256
+    → http://127.0.0.1:8100/p/0 ... (fiyat metinleri listelenir)
+
+loadtest.py aynı sınıfı kendi sürecinde başlatır.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Görünür fiyat metni ve yapısal veri biçimleri:
+#   tr        "1.299,90 TL"  (span.product-price)
+#   symbol    "₺1.299,90"    (div.price-box > strong)
+#   jsonld    tr + JSON-LD Offer
+#   meta      tr + <meta property="product:price:amount">
+#   microdata tr + itemprop="price"
+#   plain     "1299,90 TL"   (binlik ayırıcısız)
+#   jsonld_list  tr + JSON-LD Offer'da indirimsiz liste fiyatı (görünür fiyattan farklı)
+#   meta_list    tr + meta etiketinde indirimsiz liste fiyatı (görünür fiyattan farklı)
+PRICE_FORMATS = ("tr", "symbol", "jsonld", "meta", "microdata", "plain",
+                 "jsonld_list", "meta_list")
+DEFAULT_FORMATS = ("tr", "symbol", "jsonld", "meta", "microdata")
+
+_WORDS = (
+    "kablosuz", "kulaklık", "akıllı", "saat", "telefon", "kılıf", "şarj", "aleti",
+    "çelik", "tencere", "seti", "koşu", "ayakkabısı", "erkek", "kadın", "pamuklu",
+    "tişört", "oyuncu", "mouse", "klavye", "monitör", "lazer", "yazıcı", "kahve",
+    "makinesi", "robot", "süpürge", "bluetooth", "hoparlör", "tablet", "kalem",
+)
+
+
+def format_tr(kurus: int) -> str:
+    """129990 → '1.299,90'"""
+    lira, rest = divmod(kurus, 100)
+    return f"{lira:,}".replace(",", ".") + f",{rest:02d}"
+
+
+def price_text(kurus: int, fmt: str) -> str:
+    if fmt == "symbol":
+        return "₺" + format_tr(kurus)
+    if fmt == "plain":
+        lira, rest = divmod(kurus, 100)
+        return f"{lira},{rest:02d} TL"
+    return format_tr(kurus) + " TL"
+
+
+def _machine(kurus: int) -> str:
+    return f"{kurus // 100}.{kurus % 100:02d}"
+
+
+class MockShop:
+    """
+    Sahte mağaza: ürün kataloğu + ThreadingHTTPServer.
+    page_kb, formats: ürünlere sırayla dağıtılır (ürün i → page_kb[i % n]).
+    js_ratio: fiyatı yalnızca JS ile yazılan ürün oranı (requests katmanı bulamaz).
+    latency_ms: yanıt başına ortalama gecikme (±%50); error_rate: 503 oranı.
+    change_rate: tick() başına fiyatı değişen ürün oranı (±%10).
+    """
+
+    def __init__(self, products: int = 50, page_kb=(64,), formats=DEFAULT_FORMATS,
+                 js_ratio: float = 0.0, latency_ms: float = 0.0, error_rate: float = 0.0,
+                 change_rate: float = 0.2, seed: int = 1):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.change_rate = change_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._templates: dict[int, str] = {}
+        self._server = None
+        self.base_url = ""
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0}
+
+        self.products = []
+        for i in range(products):
+            rng = random.Random(seed * 1_000_003 + i)
+            self.products.append({
+                "index": i,
+                "name": " ".join(rng.sample(_WORDS, 3)).title(),
+                "kb": page_kb[i % len(page_kb)],
+                "format": formats[i % len(formats)],
+                "js": rng.random() < js_ratio,
+                "kurus": rng.randrange(5_000, 5_000_000),
+                "list_ratio": rng.uniform(1.2, 1.6),
+                "seed": rng.randrange(1 << 30),
+            })
+
+    # ── Katalog ──────────────────────────────────────────────────────────────
+
+    def url(self, index: int) -> str:
+        return f"{self.base_url}/p/{index}"
+
+    def price(self, index: int) -> float:
+        return self.products[index]["kurus"] / 100
+
+    def price_text(self, index: int) -> str:
+        product = self.products[index]
+        return price_text(product["kurus"], product["format"])
+
+    def tick(self) -> int:
+        """Ürünlerin change_rate kadarının fiyatını ±%10 değiştirir. Returns: değişen sayısı"""
+        changed = 0
+        with self._lock:
+            for product in self.products:
+                if self._rng.random() < self.change_rate:
+                    factor = self._rng.uniform(0.9, 1.1)
+                    product["kurus"] = max(100, round(product["kurus"] * factor))
+                    changed += 1
+        return changed
+
+    # ── Sayfa üretimi ────────────────────────────────────────────────────────
+
+    def _template(self, product: dict) -> str:
+        """Fiyat yer tutuculu sayfa; ürün başına bir kez üretilir."""
+        cached = self._templates.get(product["index"])
+        if cached is not None:
+            return cached
+        rng = random.Random(product["seed"])
+        fmt, js = product["format"], product["js"]
+        head = [f"<title>{product['name']} | Mock Shop</title>",
+                '<meta name="viewport" content="width=device-width">']
+        # *_list biçimlerinde yapısal veri görünür fiyatı değil liste fiyatını taşır
+        structured = "@@LIST_NUM@@" if fmt.endswith("_list") else "@@PRICE_NUM@@"
+        if not js and fmt in ("jsonld", "jsonld_list"):
+            offer = {"@context": "https://schema.org", "@type": "Product",
+                     "name": product["name"],
+                     "offers": {"@type": "Offer", "price": structured,
+                                "priceCurrency": "TRY"}}
+            head.append('<script type="application/ld+json">'
+                        f"{json.dumps(offer, ensure_ascii=False)}</script>")
+        if not js and fmt in ("meta", "meta_list"):
+            head.append(f'<meta property="product:price:amount" content="{structured}">')
+            head.append('<meta property="product:price:currency" content="TRY">')
+
+        if js:
+            price_html = ('<span class="product-price" id="price"></span>'
+                          '<script>document.getElementById("price").textContent = '
+                          '"@@PRICE_TEXT@@";</script>')
+        elif fmt == "symbol":
+            price_html = '<div class="price-box"><strong>@@PRICE_TEXT@@</strong></div>'
+        elif fmt == "microdata":
+            price_html = ('<span class="product-price" itemprop="price" '
+                          'content="@@PRICE_NUM@@">@@PRICE_TEXT@@</span>')
+        else:
+            price_html = '<span class="product-price">@@PRICE_TEXT@@</span>'
+
+        old = price_text(round(product["kurus"] * rng.uniform(1.2, 1.6)), fmt)
+        main = (f'<div class="product-detail"><h1>{product["name"]}</h1>'
+                f'<del class="old-price">{old}</del>{price_html}'
+                '<button class="add-to-cart">Sepete Ekle</button></div>')
+
+        budget = product["kb"] * 1024
+        nav = "".join(f'<li><a href="/c/{i}">{rng.choice(_WORDS).title()}</a></li>'
+                      for i in range(40))
+        body = [f'<header><ul class="menu">{nav}</ul></header>', main]
+        size = sum(map(len, head)) + sum(map(len, body))
+        while size < budget:
+            block = self._filler(rng, fmt)
+            body.append(block)
+            size += len(block)
+        page = (f'<!DOCTYPE html><html lang="tr"><head>{"".join(head)}</head>'
+                f'<body>{"".join(body)}</body></html>')
+        self._templates[product["index"]] = page
+        return page
+
+    @staticmethod
+    def _filler(rng: random.Random, fmt: str) -> str:
+        if rng.random() < 0.3:
+            text = " ".join(rng.choice(_WORDS) for _ in range(60))
+            return f'<div class="description"><p>{text}</p></div>'
+        kurus = rng.randrange(5_000, 5_000_000)
+        name = " ".join(rng.sample(_WORDS, 3)).title()
+        return (f'<div class="card"><a href="/p/r{rng.randrange(10**6)}">{name}</a>'
+                f'<span class="card-price">{price_text(kurus, fmt)}</span>'
+                f'<del class="old-price">{price_text(kurus * 2, fmt)}</del></div>')
+
+    def render(self, index: int) -> str:
+        product = self.products[index]
+        with self._lock:
+            kurus = product["kurus"]
+        return (self._template(product)
+                .replace("@@PRICE_TEXT@@", price_text(kurus, product["format"]))
+                .replace("@@PRICE_NUM@@", _machine(kurus))
+                .replace("@@LIST_NUM@@", _machine(round(kurus * product["list_ratio"]))))
+
+    # ── Sunucu ───────────────────────────────────────────────────────────────
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        shop = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                shop._serve(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://{host}:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _serve(self, handler: BaseHTTPRequestHandler):
+        if self.latency_ms:
+            time.sleep(self.latency_ms * random.uniform(0.5, 1.5) / 1000)
+        status, body = 200, b""
+        parts = handler.path.split("?")[0].strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "p" or not parts[1].isdigit() \
+                or int(parts[1]) >= len(self.products):
+            status = 404
+        elif random.random() < self.error_rate:
+            status = 503
+        else:
+            body = self.render(int(parts[1])).encode("utf-8")
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["errors"] += status != 200
+            self.stats["bytes"] += len(body)
+        handler.send_response(status)
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+# ── Komut satırı ──────────────────────────────────────────────────────────────
+
+def _csv(cast):
+    return lambda value: tuple(cast(v) for v in value.split(","))
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Mağaza seçenekleri (loadtest.py de kullanır)."""
+    group = parser.add_argument_group("sahte mağaza")
+    group.add_argument("--products", type=int, default=50)
+    group.add_argument("--page-kb", type=_csv(int), default=(64,),
+                       help="sayfa boyutları (KB), ürünlere sırayla: 16,64,512")
+    group.add_argument("--formats", type=_csv(str), default=DEFAULT_FORMATS,
+                       help=f"fiyat biçimleri: {','.join(PRICE_FORMATS)}")
+    group.add_argument("--js-ratio", type=float, default=0.0,
+                       help="fiyatı yalnızca JS ile yazılan ürün oranı")
+    group.add_argument("--latency-ms", type=float, default=20.0)
+    group.add_argument("--error-rate", type=float, default=0.0)
+    group.add_argument("--change-rate", type=float, default=0.2,
+                       help="tur başına fiyatı değişen ürün oranı")
+    group.add_argument("--seed", type=int, default=1)
+
+
+def from_args(args) -> MockShop:
+    unknown = set(args.formats) - set(PRICE_FORMATS)
+    if unknown:
+        raise SystemExit(f"Bilinmeyen fiyat biçimi: {', '.join(sorted(unknown))}")
+    return MockShop(args.products, args.page_kb, args.formats, args.js_ratio,
+                    args.latency_ms, args.error_rate, args.change_rate, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yük testi için sahte e-ticaret sitesi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    shop = from_args(args)
+    shop.start(args.host, args.port)
+    for product in shop.products:
+        i = product["index"]
+        print(f"{shop.url(i)}  {shop.price_text(i):>16}  {product['format']:<9} "
+              f"{product['kb']:>4} KB{'  js' if product['js'] else ''}")
+    print(f"Sahte mağaza {shop.base_url} üzerinde çalışıyor (CTRL+C ile çıkış)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        shop.stop()
+
+
+if __name__ == "__main__":
+    main()
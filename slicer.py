@@ -0,0 +1,493 @@
+"""
+slicer.py — Büyük sayfalarda ağaç kurmadan önce ilgili bölgeleri ayıklama.
+
+BeautifulSoup (html.parser) ağacı HTML metninin kabaca 8-10 katı bellek tutar;
+birkaç MB'lık pazar yeri sayfası eşzamanlı kontrollerde container sınırına
+yaklaşır. slice_html sayfayı stdlib HTMLParser ile parça parça tarar (ağaç
+kurmadan) ve yalnızca fiyat stratejilerinin baktığı bölgeleri küçük bir belgeye
+kopyalar:
+  - tüm <meta> etiketleri ve JSON-LD script'leri
+  - itemprop="price" / "lowPrice" elementleri
+  - kalibre seçicilerin hedef elementleri (ata etiket zinciriyle birlikte,
+    böylece "div.kutu > span.fiyat" gibi yollar dilimde de eşleşir)
+
+Dilim yetmezse (seçici bulunamadı, bölge çok büyük) çağıran tüm sayfayı
+MAX_HTML_BYTES ile kesilmiş olarak ayrıştırır (tracker.extract_from_html).
+
+Sayfa başına bellek:
+    PAGE_MEMORY_TRACE=1  → tagtrack_page_memory_bytes (tracemalloc zirvesi)
+    python slicer.py measure --container-mb 1024   # arşivdeki sayfalarla boyutlandırma
+    python slicer.py verify [--snapshots]          # dilimli = tam çıkarım mı (CI)
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from html.parser import HTMLParser
+
+import metrics
+
+# Bu boyutu aşan HTML kesilir (karakter; sayfalar çoğunlukla ASCII)
+MAX_HTML_BYTES = int(os.getenv("MAX_HTML_BYTES", str(8 * 1024 * 1024)))
+
+# Bundan küçük sayfalar doğrudan ayrıştırılır (dilimleme kazandırmaz)
+SLICE_MIN_BYTES = int(os.getenv("SLICE_MIN_BYTES", str(256 * 1024)))
+
+# Dilim belgesinin ve tek bölgenin üst sınırı; aşılırsa tam ayrıştırmaya düşülür
+SLICE_MAX_BYTES = 512 * 1024
+REGION_MAX_BYTES = 64 * 1024
+MAX_REGIONS = 32
+
+# HTMLParser'a tek seferde verilen metin
+FEED_CHUNK = 64 * 1024
+
+PAGE_MEMORY_TRACE = os.getenv("PAGE_MEMORY_TRACE", "0") == "1"
+
+VOID_TAGS = frozenset(
+    "area base br col embed hr img input link meta param source track wbr".split()
+)
+MICRODATA_PROPS = ("price", "lowPrice")
+
+
+def cap_html(html: str) -> str:
+    if len(html) <= MAX_HTML_BYTES:
+        return html
+    metrics.PAGES_TRUNCATED.inc()
+    return html[:MAX_HTML_BYTES]
+
+
+# ── Seçici çapaları ───────────────────────────────────────────────────────────
+
+_PART = re.compile(
+    r"#(?P<id>(?:\\.|[\w-])+)"
+    r"|\.(?P<cls>(?:\\.|[\w-])+)"
+    r"|\[(?P<attr>[\w-]+)(?:=\"?(?P<value>[^\"\]]*)\"?)?\]"
+    r"|:(?:[\w-]+)(?:\((?:[^()\"]|\"[^\"]*\")*\))?"
+)
+_TAG = re.compile(r"[a-zA-Z][\w-]*")
+
+# Konuma bağlı sözde sınıflar: kardeşler dilime alınmadığından dilimde farklı eşleşir
+_POSITIONAL = re.compile(r":(?:nth-|first-|last-|only-)")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+def _compounds(selector: str) -> list[tuple[str, str]]:
+    """
+    Seçiciyi birleştiricilerden (boşluk, >, ~, +) böler; parantez/tırnak içini korur.
+    Returns: [(önceki birleştirici, bileşen), ...] — ilk bileşende birleştirici ""
+    """
+    parts, current, depth, quote = [], [], 0, None
+    combinator = ""
+    for ch in selector:
+        if quote:
+            current.append(ch)
+            if ch == quote:
+                quote = None
+            continue
+        if ch in "\"'":
+            quote = ch
+        elif ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        elif depth == 0 and (ch.isspace() or ch in ">~+"):
+            if current:
+                parts.append((combinator, "".join(current)))
+                current = []
+                combinator = " "
+            if ch in ">~+":
+                combinator = ch
+            continue
+        current.append(ch)
+    if current:
+        parts.append((combinator, "".join(current)))
+    return parts
+
+
+class Anchor:
+    """Akış sırasında başlangıç etiketiyle eşlenebilen basit seçici (tag#id.class[attr])."""
+
+    def __init__(self, tag, element_id, classes, attrs):
+        self.tag = tag
+        self.id = element_id
+        self.classes = frozenset(classes)
+        self.attrs = tuple(attrs)
+
+    def matches(self, tag: str, attrs: dict) -> bool:
+        if self.tag and self.tag != tag:
+            return False
+        if self.id and attrs.get("id") != self.id:
+            return False
+        if self.classes and not self.classes <= set((attrs.get("class") or "").split()):
+            return False
+        return all(attrs.get(name) == value for name, value in self.attrs)
+
+
+def selector_anchor(selector: str) -> Anchor | None:
+    """
+    Seçicinin sağdan ilk id/class/attribute içeren bileşeni. Bu elementin alt
+    ağacı (atalarıyla) dilime alınır; yalnızca tag/pseudo içeren seçici çapa vermez.
+    Çapa ve solundaki bileşenler konum sözde sınıfı ya da kardeş birleştiricisi
+    (~, +) içeremez: ata zinciri kardeşsiz kopyalandığından bunlar dilimde başka
+    elementle eşleşebilir. Çapanın alt ağacındaki kısım serbesttir.
+    """
+    compounds = _compounds(selector)
+    usable = len(compounds)
+    for i, (combinator, compound) in enumerate(compounds):
+        if combinator in ("~", "+"):
+            usable = i - 1
+            break
+        if _POSITIONAL.search(compound):
+            usable = i
+            break
+    for _, compound in reversed(compounds[:max(usable, 0)]):
+        tag_match = _TAG.match(compound)
+        tag = tag_match.group(0).lower() if tag_match else None
+        element_id, classes, attrs = None, [], []
+        for part in _PART.finditer(compound, tag_match.end() if tag_match else 0):
+            if part.group("id"):
+                element_id = _unescape(part.group("id"))
+            elif part.group("cls"):
+                classes.append(_unescape(part.group("cls")))
+            elif part.group("attr") and part.group("value") is not None:
+                attrs.append((part.group("attr").lower(), part.group("value")))
+        if element_id or classes or attrs:
+            return Anchor(tag, element_id, classes, attrs)
+    return None
+
+
+# ── Akış halinde dilimleme ────────────────────────────────────────────────────
+
+class _Slicer(HTMLParser):
+    def __init__(self, anchors: list[Anchor]):
+        super().__init__(convert_charrefs=False)
+        self.anchors = anchors
+        # Meta, JSON-LD ve hedef bölgeler belge sırasıyla (soup.find ilkini bulur)
+        self.parts: list[str] = []
+        self.regions = 0
+        self.size = 0
+        self.overflow = False
+        # Açık elementler: (tag, ham başlangıç etiketi)
+        self._stack: list[tuple[str, str]] = []
+        self._ld: list[str] | None = None
+        self._capture: list[str] | None = None
+        self._capture_root = 0
+        self._capture_size = 0
+        self._closers = ""
+
+    def _add(self, text: str):
+        self.size += len(text)
+        if self.size > SLICE_MAX_BYTES or self.regions > MAX_REGIONS:
+            self.overflow = True
+        else:
+            self.parts.append(text)
+
+    def _is_target(self, tag: str, attrs: dict) -> bool:
+        if attrs.get("itemprop") in MICRODATA_PROPS:
+            return True
+        return any(anchor.matches(tag, attrs) for anchor in self.anchors)
+
+    def _emit(self, text: str):
+        if self._capture is None:
+            return
+        self._capture.append(text)
+        self._capture_size += len(text)
+        if self._capture_size > REGION_MAX_BYTES:
+            # Çok büyük bölge (örn. sayfa kapsayıcısı): eksik dilim yanlış seçiciyi
+            # öne çıkarabilir, tam ayrıştırmaya düşülür
+            self.overflow = True
+
+    def _finish_capture(self):
+        if self._capture is not None:
+            self.regions += 1
+            self._add("".join(self._capture) + self._closers)
+        self._capture = None
+
+    def handle_starttag(self, tag, attrs):
+        raw = self.get_starttag_text()
+        attrs = {name: value or "" for name, value in attrs}
+        if self._capture is not None:
+            # Bölge içindeki meta / JSON-LD bölgeyle birlikte gelir
+            self._emit(raw)
+        elif tag == "meta":
+            self._add(raw)
+        elif tag == "script" and attrs.get("type", "").lower() == "application/ld+json":
+            self._ld = [raw]
+        elif self._is_target(tag, attrs):
+            self._capture = ["".join(start for _, start in self._stack), raw]
+            self._capture_size = sum(len(part) for part in self._capture)
+            self._capture_root = len(self._stack)
+            self._closers = "".join(f"</{name}>" for name, _ in reversed(self._stack))
+            if tag in VOID_TAGS:
+                self._finish_capture()
+
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, raw))
+
+    def handle_endtag(self, tag):
+        if self._ld is not None and tag == "script":
+            self._add("".join(self._ld) + "</script>")
+            self._ld = None
+        self._emit(f"</{tag}>")
+        # Kapanmamış elementler (örn. <li>, <p>) eşleşen etikete kadar kapatılır
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                break
+        if self._capture is not None and len(self._stack) <= self._capture_root:
+            self._finish_capture()
+
+    def handle_data(self, data):
+        if self._ld is not None:
+            self._ld.append(data)
+        self._emit(data)
+
+    def handle_entityref(self, name):
+        self._emit(f"&{name};")
+
+    def handle_charref(self, name):
+        self._emit(f"&#{name};")
+
+
+def anchored_prefix(selectors: list[str] | str) -> list[str]:
+    """
+    Sıralı seçici setinin baştan çapalı kısmı. Seçiciler sırayla denendiğinden
+    bu kısımdan biri dilimde fiyat verirse tam sayfada da aynı element kazanır;
+    hiçbiri vermezse çağıran tam ayrıştırmaya düşmelidir.
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    prefix = []
+    for selector in selectors:
+        if selector_anchor(selector) is None:
+            break
+        prefix.append(selector)
+    return prefix
+
+
+def slice_html(html: str, selectors: list[str] | str | None = None) -> str | None:
+    """
+    Sayfanın fiyat için gereken kısımlarından küçük bir HTML belgesi üretir.
+    Returns: dilim belgesi; sınırlar aşıldıysa None (tam ayrıştırma gerekir)
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    anchors = [selector_anchor(s) for s in selectors or []]
+    if None in anchors:
+        # Çapasız seçici tam sayfada eşleşip dilimde eşleşmeyebilir
+        return None
+    parser = _Slicer(anchors)
+    for start in range(0, len(html), FEED_CHUNK):
+        parser.feed(html[start:start + FEED_CHUNK])
+        if parser.overflow:
+            return None
+    parser.close()
+    parser._finish_capture()
+    if parser.overflow:
+        return None
+    return "<html><body>" + "".join(parser.parts) + "</body></html>"
+
+
+# ── Bellek ölçümü ─────────────────────────────────────────────────────────────
+
+@contextmanager
+def measure_memory():
+    """
+    PAGE_MEMORY_TRACE=1 iken bloğun Python bellek zirvesini (tracemalloc)
+    tagtrack_page_memory_bytes'a yazar. tracemalloc süreç geneli olduğundan
+    aynı süreçte eşzamanlı kontroller varsa değer üst sınırdır.
+    """
+    if not PAGE_MEMORY_TRACE:
+        yield
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        metrics.PAGE_MEMORY_BYTES.observe(tracemalloc.get_traced_memory()[1] - base)
+
+
+def _peak(func) -> int:
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    func()
+    return tracemalloc.get_traced_memory()[1] - base
+
+
+def measure_snapshots(limit: int | None = None) -> list[dict]:
+    """Arşivdeki sayfalarda tam ve dilimli çıkarımın bellek zirvesi (bayt)."""
+    import database
+    import snapshots
+    from tracker import active_selectors, extract_from_html
+
+    rows = database.get_page_snapshots(latest_only=True, limit=limit)
+    tracemalloc.start()
+    results = []
+    try:
+        for row in rows:
+            try:
+                html = snapshots.load(row["content_hash"], row["codec"])
+            except OSError:
+                continue
+            selectors = active_selectors(row)
+            result = {"id": row["id"], "html": len(html)}
+            for mode, bounded in (("full", False), ("bounded", True)):
+                def run():
+                    try:
+                        extract_from_html(html, selectors, row["initial_price"], bounded=bounded)
+                    except ValueError:
+                        pass
+                result[mode] = _peak(run)
+            results.append(result)
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+# ── Doğrulama ─────────────────────────────────────────────────────────────────
+
+def _fixture(head: str, main: str, card_prices: bool = True) -> str:
+    """SLICE_MIN_BYTES'ı aşan, öneri kartlarıyla doldurulmuş ürün sayfası."""
+    price_class = "card-price" if card_prices else "card-info"
+    card = ('<div class="card"><a href="/p/{i}">Ürün {i}</a>'
+            f'<span class="{price_class}">{{i}},90 TL</span>'
+            '<del class="old-price">999,00 TL</del></div>')
+    filler, size, i = [], 0, 0
+    while size < SLICE_MIN_BYTES + 100 * 1024:
+        block = card.format(i=i)
+        filler.append(block)
+        size += len(block)
+        i += 1
+    return (f"<html><head>{head}</head><body><div id=\"main\">{main}</div>"
+            f"<section class=\"list\">{''.join(filler)}</section></body></html>")
+
+
+_LD = ('<script type="application/ld+json">'
+       '{"@type": "Product", "offers": {"@type": "Offer", "price": "%s"}}</script>')
+_META = '<meta property="product:price:amount" content="%s">'
+
+# (ad, html, seçiciler, initial_price)
+VERIFY_CASES = [
+    # Seçici yapısal verilerle çelişiyor: uzlaşı tam sayfada JSON-LD'yi seçer
+    ("selector_disagrees", _fixture(_LD % "200.00" + _META % "200.00",
+                                    '<b id="fiyat">100,00 TL</b><span class="price">200,00 TL</span>',
+                                    card_prices=False),
+     ["#fiyat"], None),
+    ("selector_agrees", _fixture(_LD % "200.00", '<b id="fiyat">200,00 TL</b>'), ["#fiyat"], 190.0),
+    ("selector_only", _fixture("", '<div class="box"><span class="now">1.299,00 TL</span></div>'),
+     ["div.box > span.now"], 1250.0),
+    ("selector_missing", _fixture(_LD % "49.90", '<span class="now">49,90 TL</span>'),
+     ["span.gone"], 50.0),
+    ("stale_structured", _fixture(_LD % "75.00" + _META % "75.00", '<span class="price">75,00 TL</span>'),
+     None, 70.0),
+    ("structured_conflict", _fixture(_LD % "75.00" + _META % "80.00", ""), None, 70.0),
+    # Konum sözde sınıfı çapanın solunda: dilimde ilk karta eşleşirdi
+    ("positional", _fixture("", "".join(f'<div class="row"><span class="p">{n}0,00 TL</span></div>'
+                                        for n in range(1, 5))),
+     ["#main > div.row:nth-of-type(3) > span.p"], 30.0),
+    # Gövdedeki itemprop sırası: ilk element span, meta sonra gelir
+    ("microdata_order", _fixture("", '<span itemprop="price">120,00 TL</span>'
+                                     '<meta itemprop="price" content="130.00">'), None, 125.0),
+    ("selector_list", _fixture(_LD % "60.00", '<div class="buy"><em class="v">60,00 TL</em></div>'),
+     ["span.yok", "div.buy em.v"], 60.0),
+    # Kalibrasyon setleri gibi: çapalı ilk seçici, ardından kardeş/konum yedekleri
+    ("calibrated_set", _fixture(_LD % "60.00", '<h1>Ürün</h1><em class="v">60,00 TL</em>'),
+     ["em.v", 'h1:-soup-contains("Ürün") ~ em.v', "#main > em.v:nth-of-type(1)"], 60.0),
+    ("calibrated_set_missing", _fixture(_LD % "60.00", '<h1>Ürün</h1><em class="w">60,00 TL</em>'),
+     ["em.v", 'h1:-soup-contains("Ürün") ~ em.w'], 60.0),
+]
+
+
+def verify_html(html: str, selectors, initial_price) -> tuple:
+    """Aynı HTML'de tam ve dilimli çıkarım. Returns: ((fiyat, kaynak), (fiyat, kaynak))"""
+    from tracker import extract_from_html
+
+    def run(bounded):
+        try:
+            return tuple(extract_from_html(html, selectors, initial_price, bounded=bounded)[:2])
+        except ValueError as exc:
+            return (None, str(exc))
+
+    return run(False), run(True)
+
+
+def verify(limit: int | None = None, snapshots_too: bool = False) -> list[tuple]:
+    """
+    Dilimli çıkarımın tam ayrıştırmayla aynı sonucu verdiğini yerleşik büyük
+    sayfalarda (ve istenirse arşivdeki sayfalarda) doğrular. Returns: farklar
+    """
+    cases = [(name, html, sel, initial) for name, html, sel, initial in VERIFY_CASES]
+    if snapshots_too:
+        import database
+        import snapshots
+        from tracker import active_selectors
+
+        for row in database.get_page_snapshots(latest_only=True, limit=limit):
+            try:
+                html = snapshots.load(row["content_hash"], row["codec"])
+            except OSError:
+                continue
+            cases.append((f"snapshot #{row['id']}", html, active_selectors(row),
+                          row["initial_price"]))
+    diffs = []
+    for name, html, selectors, initial in cases:
+        full, bounded = verify_html(html, selectors, initial)
+        if full != bounded:
+            diffs.append((name, full, bounded))
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sayfa başına ayrıştırma belleği")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ms = sub.add_parser("measure", help="arşivdeki sayfalarla bellek ölçümü")
+    ms.add_argument("--limit", type=int)
+    ms.add_argument("--container-mb", type=float, default=1024)
+    ms.add_argument("--reserve-mb", type=float, default=400,
+                    help="süreç tabanı + tarayıcılar için ayrılan bellek")
+    vf = sub.add_parser("verify", help="dilimli ve tam çıkarım aynı sonucu veriyor mu")
+    vf.add_argument("--snapshots", action="store_true", help="arşivdeki sayfaları da dene")
+    vf.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    import database
+
+    if args.command == "verify":
+        if args.snapshots:
+            database.setup_database()
+        diffs = verify(args.limit, args.snapshots)
+        for name, full, bounded in diffs:
+            print(f"FARK {name}: tam {full} ≠ dilimli {bounded}")
+        print(f"{len(diffs)} fark" if diffs else "Dilimli çıkarım tam ayrıştırmayla aynı.")
+        if diffs:
+            sys.exit(1)
+        return
+
+    database.setup_database()
+    results = measure_snapshots(args.limit)
+    if not results:
+        print("Arşivde sayfa yok (snapshots.py).")
+        return
+    mb = 1024 * 1024
+    budget = (args.container_mb - args.reserve_mb) * mb
+    print(f"{len(results)} sayfa, HTML medyan {statistics.median(r['html'] for r in results) / mb:.2f} MB")
+    for mode in ("full", "bounded"):
+        peaks = sorted(r[mode] for r in results)
+        p95 = peaks[min(len(peaks) - 1, int(len(peaks) * 0.95))]
+        print(f"{mode:<8} medyan {statistics.median(peaks) / mb:7.2f} MB  "
+              f"p95 {p95 / mb:7.2f} MB  en çok {peaks[-1] / mb:7.2f} MB  "
+              f"→ eşzamanlı sayfa ≈ {int(budget // max(p95, 1))}")
+
+
+if __name__ == "__main__":
+    main()
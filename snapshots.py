@@ -0,0 +1,296 @@
+"""
+snapshots.py — Çekilen sayfaların sıkıştırılmış arşivi ve çevrimdışı tekrar oynatma.
+
+Her kontrolde çekilen HTML, içerik özeti (sha256) ile tekilleştirilip zstd ile
+sıkıştırılarak SNAPSHOT_DIR altında saklanır; değişmeyen sayfa tekrar yazılmaz.
+Ürün başına son SNAPSHOT_KEEP sayfa tutulur; SNAPSHOT_MAX_AGE_DAYS'ten eski
+kayıtlar ve SNAPSHOT_MAX_MB'ı aşan en eski kayıtlar, kaydı yapan her süreçte
+(API, run_loop, worker) en fazla PRUNE_INTERVAL'de bir temizlenir. zstandard paketi yoksa stdlib gzip kullanılır.
+
+Çıkarım değişikliklerini canlı istek atmadan doğrulamak için:
+    python snapshots.py replay                    # her ürünün son sayfası, extract_price
+    python snapshots.py replay --mode calibrate   # _find_best_match + seçici seti
+    python snapshots.py replay --all --workers 8 --product-id 42
+    python snapshots.py stats | prune
+"""
+
+import argparse
+import codecs
+import gzip
+import hashlib
+import mmap
+import os
+import sys
+import time
+
+import database
+import tracing
+
+SNAPSHOTS_ENABLED = os.getenv("SNAPSHOTS_ENABLED", "1") == "1"
+SNAPSHOT_DIR = os.getenv(
+    "SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(database.DB_PATH)), "snapshots"),
+)
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "5"))
+SNAPSHOT_MAX_AGE_DAYS = float(os.getenv("SNAPSHOT_MAX_AGE_DAYS", "30"))
+SNAPSHOT_MAX_MB = float(os.getenv("SNAPSHOT_MAX_MB", "1024"))
+
+# zstd seviyesi: 3 hızlı; HTML'de gzip -6'dan küçük çıktı verir
+ZSTD_LEVEL = 3
+
+# Temizlik en fazla bu sıklıkla çalışır (sn); referanssız blob bu süre sonra silinir
+PRUNE_INTERVAL = 600
+
+# Okumada açılan sıkıştırılmış veri parçası
+READ_CHUNK = 1 << 20
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_CODEC = "zstd" if zstandard is not None else "gzip"
+_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def blob_path(content_hash: str, codec: str) -> str:
+    # İlk iki karaktere göre alt dizin: tek dizinde yüz binlerce dosya olmasın
+    return os.path.join(SNAPSHOT_DIR, content_hash[:2], content_hash + _EXTENSIONS[codec])
+
+
+# ── Yazma ─────────────────────────────────────────────────────────────────────
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _write_blob(data: bytes, content_hash: str, codec: str) -> int:
+    """Blob dosyasını (yoksa) atomik olarak yazar. Returns: diskteki boyut"""
+    path = blob_path(content_hash, codec)
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    packed = _compress(data, codec)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(packed)
+    os.replace(tmp, path)
+    return len(packed)
+
+
+def save(product_id: int, html: str, fetch_tier: str | None = None, price=None,
+         source=None, error=None) -> int | None:
+    """
+    Sayfayı arşive ekler. Kontrolü asla bozmaz: hata olursa yazdırıp None döner.
+    Returns: snapshot id
+    """
+    if not SNAPSHOTS_ENABLED:
+        return None
+    try:
+        data = html.encode("utf-8", "surrogatepass")
+        content_hash = hashlib.sha256(data).hexdigest()
+        stored = _write_blob(data, content_hash, DEFAULT_CODEC)
+        tracing.attach_snapshot(content_hash)
+        snapshot_id = database.add_page_snapshot(
+            product_id, content_hash, DEFAULT_CODEC, len(data), stored,
+            fetch_tier, price, source, error, keep=SNAPSHOT_KEEP,
+        )
+    except Exception as exc:
+        print(f"Sayfa arşivlenemedi (#{product_id}): {exc}")
+        return None
+    # Worker'sız kurulumlarda (yalnızca API veya run_loop) da sınırlar uygulansın
+    try:
+        prune()
+    except Exception as exc:
+        print(f"Sayfa arşivi temizlenemedi: {exc}")
+    return snapshot_id
+
+
+# ── Okuma ─────────────────────────────────────────────────────────────────────
+
+def iter_text(content_hash: str, codec: str):
+    """
+    Blobu parça parça açar. Dosya mmap ile okunur; sıkıştırılmış veri
+    Python belleğine kopyalanmaz, yalnızca açılmış metin parçaları üretilir.
+    """
+    if codec == "zstd" and zstandard is None:
+        raise RuntimeError("zstd snapshot'larını okumak için 'zstandard' paketi gerekli.")
+    decoder = codecs.getincrementaldecoder("utf-8")("surrogatepass")
+    with open(blob_path(content_hash, codec), "rb") as fh, \
+            mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if codec == "zstd":
+            reader = zstandard.ZstdDecompressor().stream_reader(mm)
+        else:
+            reader = gzip.GzipFile(fileobj=mm)
+        with reader:
+            while chunk := reader.read(READ_CHUNK):
+                yield decoder.decode(chunk)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def load(content_hash: str, codec: str) -> str:
+    return "".join(iter_text(content_hash, codec))
+
+
+# ── Temizlik ──────────────────────────────────────────────────────────────────
+
+_last_prune = 0.0
+
+
+def prune(force: bool = False) -> dict:
+    """
+    Yaş ve toplam boyut sınırını uygular, referanssız blob dosyalarını siler.
+    force=False iken süreç başına PRUNE_INTERVAL'de bir çalışır (save() her kayıtta çağırır).
+    """
+    global _last_prune
+    now = time.time()
+    if not force and now - _last_prune < PRUNE_INTERVAL:
+        return {}
+    _last_prune = now
+
+    expired = database.prune_page_snapshots(int(now - SNAPSHOT_MAX_AGE_DAYS * 86400))
+    idle_before = int(now) if force else int(now - PRUNE_INTERVAL)
+    removed = _collect(idle_before)
+
+    # Boyut sınırı: en eski snapshot'lar parti parti silinir
+    max_bytes = SNAPSHOT_MAX_MB * 1024 * 1024
+    evicted = 0
+    while database.get_snapshot_stats()["stored_bytes"] > max_bytes:
+        deleted = database.delete_oldest_page_snapshots(500)
+        collected = _collect(idle_before)
+        evicted += deleted
+        removed += collected
+        if not deleted and not collected:
+            break
+    return {"expired": expired, "evicted": evicted, "blobs_removed": removed}
+
+
+def _collect(idle_before: int) -> int:
+    blobs = database.collect_snapshot_blobs(idle_before)
+    for content_hash, codec in blobs:
+        try:
+            os.remove(blob_path(content_hash, codec))
+        except OSError:
+            pass
+    return len(blobs)
+
+
+# ── Tekrar oynatma ────────────────────────────────────────────────────────────
+
+def _replay_one(job: dict) -> dict:
+    """Süreç havuzunda tek snapshot üzerinde çıkarımı yeniden çalıştırır."""
+    from bs4 import BeautifulSoup
+
+    out = {"id": job["id"], "product_id": job["product_id"],
+           "old_price": job["price"], "old_source": job["source"], "old_error": job["error"]}
+    start = time.perf_counter()
+    try:
+        html = load(job["content_hash"], job["codec"])
+        if job["mode"] == "calibrate":
+            from calibrate import CandidateIndex, _find_best_match, build_selector_set
+            from tracker import _try_selector
+
+            target = job["price"] if job["price"] is not None else job["initial_price"]
+            soup = BeautifulSoup(html, "html.parser")
+            try:
+                index = CandidateIndex(soup)
+                best = _find_best_match(soup, target, index)
+                selectors = build_selector_set(soup, best, index)
+                out["price"] = _try_selector(soup, selectors)
+                out["source"] = selectors[0]
+            finally:
+                soup.decompose()
+        else:
+            # Kontrol yolunun aynısı (büyük sayfalarda dilimli çıkarım dahil)
+            from tracker import active_selectors, extract_from_html
+
+            out["price"], out["source"], _, _ = extract_from_html(
+                html, active_selectors(job), job["initial_price"])
+    except Exception as exc:
+        out["error"] = str(exc)
+    out["seconds"] = time.perf_counter() - start
+    return out
+
+
+def _classify(result: dict, mode: str) -> str:
+    new_error = result.get("error")
+    if result["old_error"]:
+        return "still_failing" if new_error else "fixed"
+    if new_error:
+        return "broken"
+    if result["price"] != result["old_price"]:
+        return "changed"
+    if mode == "extract" and result["source"] != result["old_source"]:
+        return "source_changed"
+    return "same"
+
+
+def replay(product_id: int | None = None, latest_only: bool = True, mode: str = "extract",
+           workers: int | None = None, limit: int | None = None) -> dict:
+    """
+    Arşivdeki sayfalar üzerinde çıkarımı süreç havuzunda toplu çalıştırır ve
+    kaydedilen sonuçla karşılaştırır (ağ erişimi yok).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    rows = database.get_page_snapshots(product_id, latest_only, limit)
+    jobs = [{**dict(row), "mode": mode} for row in rows]
+    start = time.perf_counter()
+    counts: dict[str, int] = {}
+    differences = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+        for result in pool.map(_replay_one, jobs, chunksize=chunksize):
+            outcome = _classify(result, mode)
+            counts[outcome] = counts.get(outcome, 0) + 1
+            if outcome != "same":
+                differences.append({**result, "outcome": outcome})
+    return {"total": len(jobs), "counts": counts, "differences": differences,
+            "seconds": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sayfa arşivi: tekrar oynatma ve temizlik")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rp = sub.add_parser("replay", help="arşivdeki sayfalarda çıkarımı yeniden çalıştır")
+    rp.add_argument("--mode", choices=("extract", "calibrate"), default="extract")
+    rp.add_argument("--product-id", type=int)
+    rp.add_argument("--all", action="store_true", help="yalnızca sonuncu değil tüm snapshot'lar")
+    rp.add_argument("--workers", type=int)
+    rp.add_argument("--limit", type=int)
+    sub.add_parser("stats", help="arşiv boyutu")
+    sub.add_parser("prune", help="yaş/boyut sınırını hemen uygula")
+    args = parser.parse_args()
+
+    database.setup_database()
+    if args.command == "stats":
+        stats = database.get_snapshot_stats()
+        ratio = stats["raw_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0
+        print(f"{stats['snapshots']} snapshot, {stats['blobs']} blob, "
+              f"{stats['stored_bytes'] / 1048576:.1f} MB (sıkıştırma {ratio:.1f}x)")
+        return
+    if args.command == "prune":
+        print(prune(force=True))
+        return
+
+    result = replay(args.product_id, not args.all, args.mode, args.workers, args.limit)
+    for diff in result["differences"][:50]:
+        print(f"[{diff['outcome']}] snapshot #{diff['id']} ürün #{diff['product_id']}: "
+              f"{diff['old_price']} ({diff['old_source']}) → "
+              f"{diff.get('price')} ({diff.get('source') or diff.get('error')})")
+    if len(result["differences"]) > 50:
+        print(f"... ve {len(result['differences']) - 50} fark daha")
+    summary = ", ".join(f"{k}: {v}" for k, v in sorted(result["counts"].items()))
+    print(f"{result['total']} snapshot, {result['seconds']:.1f} sn — {summary or 'boş'}")
+    if result["counts"].get("broken"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+storage.py — Veritabanı arka uçları (SQLite / PostgreSQL).
+
+database.py'deki fonksiyonlar tek bir SQL lehçesiyle (sqlite3, '?' parametreleri)
+yazılır; arka uç bağlantıyı, parametre çevirisini ve birkaç lehçe farkını
+(tip adları, yazma kilidi, SKIP LOCKED, INSERT OR IGNORE) sağlar.
+
+DATABASE_URL postgresql://... ise PostgreSQL (havuzlu bağlantılar) kullanılır;
+birden fazla API ve worker kopyası aynı veritabanını paylaşabilir. Aksi halde
+DB_PATH'teki SQLite dosyası kullanılır (tek makine).
+"""
+
+import functools
+import re
+import sqlite3
+
+# ── SQLite ────────────────────────────────────────────────────────────────────
+
+class SQLiteBackend:
+    name = "sqlite"
+
+    # Şema DDL'inde kullanılan tip yer tutucuları
+    types = {
+        "pk":        "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "int64":     "INTEGER",
+        "float":     "REAL",
+        "ts":        "TIMESTAMP",
+        "ts_now":    "TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+    }
+
+    # Kuyruktan görev alırken alt sorguya eklenen kilit ifadesi
+    skip_locked = ""
+
+    IntegrityError = sqlite3.IntegrityError
+
+    def __init__(self, path: str, busy_timeout: float):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def connect(self, check_same_thread: bool = True):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                               check_same_thread=check_same_thread)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def prepare(self, conn):
+        # WAL: okuyucular yazarı beklemez; API ve worker süreçleri aynı anda çalışabilir
+        conn.execute("PRAGMA journal_mode=WAL")
+
+    def begin_write(self, conn):
+        """Okuyup sonra yazan işlemler için yazma kilidini baştan alır."""
+        conn.execute("BEGIN IMMEDIATE")
+
+    def lock_migrations(self, conn):
+        self.begin_write(conn)
+
+    def columns(self, conn, table: str) -> set[str]:
+        return {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+    def iter_rows(self, conn, sql: str, params, chunk_size: int):
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+
+
+# ── PostgreSQL ────────────────────────────────────────────────────────────────
+
+# SQLite'ın CURRENT_TIMESTAMP biçimiyle aynı (UTC, 'YYYY-MM-DD HH:MM:SS') metin
+_PG_NOW = "to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"
+
+
+# Tırnaklı literal/tanımlayıcı, yer tutucu veya yüzde işareti
+_SQL_TOKEN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|[?%]")
+
+
+def _translate_token(match: re.Match) -> str:
+    token = match.group()
+    if token == "?":
+        return "%s"
+    # psycopg tırnak içindekiler dahil her '%'yi yer tutucu sayar
+    return token.replace("%", "%%")
+
+
+@functools.lru_cache(maxsize=512)
+def _translate(sql: str) -> str:
+    """
+    sqlite lehçesindeki sorguyu psycopg'ye çevirir: '?' yalnızca tırnak dışında
+    '%s' olur, '%' işaretleri '%%' olarak kaçırılır.
+    """
+    if sql.startswith("INSERT OR IGNORE"):
+        sql = "INSERT" + sql[len("INSERT OR IGNORE"):]
+        head, sep, tail = sql.partition(" RETURNING ")
+        sql = head + " ON CONFLICT DO NOTHING" + sep + tail
+    return _SQL_TOKEN.sub(_translate_token, sql)
+
+
+class _PgConnection:
+    """
+    Havuzdan alınmış bağlantı; sqlite3.Connection'ın kullanılan alt kümesini sunar.
+    close() bağlantıyı havuza geri verir (açık transaction geri alınır).
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def execute(self, sql: str, params=()):
+        return self._conn.execute(_translate(sql), params)
+
+    def executemany(self, sql: str, seq_of_params):
+        cursor = self._conn.cursor()
+        cursor.executemany(_translate(sql), list(seq_of_params))
+        return cursor
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        from psycopg.pq import TransactionStatus
+
+        if self._conn is not None:
+            # Salt okuma sorguları da transaction açar; commit edilmeyen her şey geri alınır
+            if self._conn.info.transaction_status != TransactionStatus.IDLE:
+                self._conn.rollback()
+            self._pool.putconn(self._conn)
+            self._conn = None
+
+    def __del__(self):
+        # Hata yolunda close() çağrılmadan bırakılan bağlantı havuzdan düşmesin
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PostgresBackend:
+    name = "postgresql"
+
+    types = {
+        "pk":        "BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY",
+        "int64":     "BIGINT",
+        "float":     "DOUBLE PRECISION",
+        "ts":        "TEXT",
+        "ts_now":    f"TEXT DEFAULT {_PG_NOW}",
+    }
+
+    skip_locked = " FOR UPDATE SKIP LOCKED"
+
+    # Şema kurulumunu kopyalar arasında sıraya sokan advisory lock anahtarı
+    MIGRATION_LOCK_KEY = 7_212_901
+
+    def __init__(self, url: str, min_size: int = 1, max_size: int = 10):
+        try:
+            import psycopg
+            from psycopg.rows import dict_row
+            from psycopg_pool import ConnectionPool
+        except ImportError as exc:
+            raise RuntimeError(
+                "PostgreSQL için 'psycopg[binary,pool]' paketi gerekli."
+            ) from exc
+        self.IntegrityError = psycopg.IntegrityError
+        self._pool = ConnectionPool(
+            url, min_size=min_size, max_size=max_size,
+            kwargs={"row_factory": dict_row}, open=True,
+        )
+
+    def connect(self, check_same_thread: bool = True):
+        return _PgConnection(self._pool, self._pool.getconn())
+
+    def prepare(self, conn):
+        pass
+
+    def begin_write(self, conn):
+        # Satır kilitleri (FOR UPDATE SKIP LOCKED) yeterli
+        pass
+
+    def lock_migrations(self, conn):
+        conn.execute("SELECT pg_advisory_xact_lock(?)", (self.MIGRATION_LOCK_KEY,))
+
+    def columns(self, conn, table: str) -> set[str]:
+        rows = conn.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = ?",
+            (table,),
+        )
+        return {row["column_name"] for row in rows}
+
+    def iter_rows(self, conn, sql: str, params, chunk_size: int):
+        # Sunucu tarafı (isimli) cursor: sonuç kümesi istemciye parça parça gelir
+        with conn._conn.cursor(name="tagtrack_export") as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(_translate(sql), params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def close(self):
+        self._pool.close()
+
+
+def create_backend(database_url: str, db_path: str, busy_timeout: float,
+                   pool_min: int = 1, pool_max: int = 10):
+    if database_url.startswith(("postgres://", "postgresql://")):
+        return PostgresBackend(database_url, pool_min, pool_max)
+    return SQLiteBackend(db_path, busy_timeout)
@@ -0,0 +1,178 @@
+"""
+tracing.py — Kontrol başına iz kaydı ve yavaş kontrol profillemesi.
+
+CHECK_PROFILING=1 iken (veya kontrol force=True ile istenirse) her ürün
+kontrolü için aşama süreleri, HTML boyutu, strateji başına aday sayıları,
+seçilen kaynak ve çekme katmanı check_traces tablosuna yazılır. Tablo
+TRACE_RETENTION kayıtla sınırlıdır. Ham HTML ayrıca saklanmaz: iz, sayfa
+arşivindeki (snapshots.py) içerik özetini tutar; `python tracing.py replay
+<trace_id>` arşivdeki sayfa üzerinde çevrimdışı tekrar oynatır.
+
+Aktif iz thread-local'dir; stage() ve count() iz yokken hiçbir şey yapmaz.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import database
+
+PROFILING_ENABLED = os.getenv("CHECK_PROFILING", "0") == "1"
+
+_local = threading.local()
+
+
+class Trace:
+    def __init__(self, product_id: int, url: str):
+        self.product_id = product_id
+        self.url = url
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.candidates: dict[str, int] = {}
+        self.fetch_tier = None
+        self.html_bytes = None
+        self.source = None
+        self.price = None
+        self.error = None
+        self.content_hash = None
+
+    def add_stage(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+
+def current() -> Trace | None:
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def stage(name: str):
+    """Aktif izde aşama süresini biriktirir."""
+    trace = current()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, time.perf_counter() - start)
+
+
+def count(strategy: str, n: int):
+    """Aktif ize strateji aday sayısını yazar."""
+    trace = current()
+    if trace is not None:
+        trace.candidates[strategy] = trace.candidates.get(strategy, 0) + n
+
+
+@contextmanager
+def start(product_id: int, url: str, force: bool = False):
+    """
+    Kontrol izini başlatır; profilleme kapalıysa ve force değilse None verir.
+    Blok bitince iz kaydedilir (hata olsa bile; hata yeniden fırlatılır).
+    """
+    if not (PROFILING_ENABLED or force):
+        yield None
+        return
+    trace = Trace(product_id, url)
+    _local.trace = trace
+    try:
+        yield trace
+    except Exception as exc:
+        trace.error = str(exc)
+        raise
+    finally:
+        _local.trace = None
+        try:
+            _save(trace)
+        except Exception as exc:
+            print(f"İz kaydedilemedi: {exc}")
+
+
+def attach_html(html: str):
+    """Çekilen HTML'in boyutunu ize yazar."""
+    trace = current()
+    if trace is not None:
+        trace.html_bytes = len(html.encode("utf-8", "ignore"))
+
+
+def attach_snapshot(content_hash: str):
+    """Sayfa arşivine yazılan HTML'in özetini ize bağlar (tekrar oynatma için)."""
+    trace = current()
+    if trace is not None:
+        trace.content_hash = content_hash
+
+
+def _save(trace: Trace):
+    total = trace.elapsed()
+    database.add_check_trace(
+        product_id=trace.product_id,
+        url=trace.url,
+        started_at=trace.started_at,
+        total_seconds=total,
+        fetch_tier=trace.fetch_tier,
+        html_bytes=trace.html_bytes,
+        stages=trace.stages,
+        candidates=trace.candidates,
+        source=trace.source,
+        price=trace.price,
+        error=trace.error,
+        content_hash=trace.content_hash,
+    )
+
+
+def load_html(trace_row) -> str | None:
+    """İzin sayfası arşivde hâlâ varsa HTML'i (yoksa None)."""
+    import snapshots
+
+    if not trace_row["content_hash"] or not trace_row["codec"]:
+        return None
+    try:
+        return snapshots.load(trace_row["content_hash"], trace_row["codec"])
+    except OSError:
+        return None
+
+
+def replay(trace_id: int) -> dict:
+    """Saklanan HTML üzerinde fiyat çıkarımını yeniden çalıştırır (ağ erişimi yok)."""
+    from tracker import active_selectors, extract_from_html
+
+    row = database.get_check_trace(trace_id)
+    if row is None:
+        raise ValueError(f"İz bulunamadı: {trace_id}")
+    html = load_html(row)
+    if html is None:
+        raise ValueError(f"İz #{trace_id} için sayfa arşivde yok.")
+    product = database.get_product_by_id(row["product_id"])
+    selectors = active_selectors(product) if product else None
+    initial = product["initial_price"] if product else None
+
+    trace = Trace(row["product_id"], row["url"])
+    _local.trace = trace
+    try:
+        price, source, results, _ = extract_from_html(html, selectors, initial)
+    finally:
+        _local.trace = None
+    return {
+        "trace_id": trace_id,
+        "price": price,
+        "source": source,
+        "results": results,
+        "stages": trace.stages,
+        "candidates": trace.candidates,
+        "original": {"price": row["price"], "source": row["source"], "error": row["error"]},
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "replay":
+        print("Kullanım: python tracing.py replay <trace_id>")
+        sys.exit(1)
+    import json
+    print(json.dumps(replay(int(sys.argv[2])), ensure_ascii=False, indent=2))
@@ -10,17 +10,36 @@ Strateji öncelik sırası:
   6. General       (tüm kısa text node'lar)
 
 Selector 3 kez üst üste başarısız olursa "stale" işaretlenir;
-sonraki kontrollerde diğer stratejiler ön plana geçer.
+sonraki kontrollerde diğer stratejiler ön plana geçer. Stale ürünlerde
+JSON-LD/meta tutarlı bir fiyat verirse, aynı sayfa üzerinden seçici
+otomatik olarak yeniden kalibre edilir.
+
+Yazmadan önce fiyat ürünün yakın geçmişine göre skorlanır (anomaly.py);
+aykırı fiyat geçmişe ve olaylara yazılmadan karantinaya alınır.
 """
 
 import json
+import math
 import re
 import time
 
 from bs4 import BeautifulSoup
 
+import anomaly
 import database
-from calibrate import fetch_html, calibrate_and_add_product
+import events
+import metrics
+import slicer
+import snapshots
+import tracing
+from calibrate import (
+    _HIDDEN_TAGS,
+    CandidateIndex,
+    build_selector_set,
+    calibrate_and_add_product,
+    fetch_html,
+    fetch_page,
+)
 from price_utils import extract_price_from_text
 
 # Seçici kaç kez üst üste başarısız olursa stale sayılır
@@ -29,25 +48,54 @@ SELECTOR_STALE_THRESHOLD = 3
 # Fiyat mantık kontrolü: initial_price'ın kaç katına kadar kabul edilir
 PRICE_SANITY_FACTOR = 10.0
 
+# Stale seçici, yapısal kaynaktan tutarlı fiyat gelince kendiliğinden yenilensin mi
+AUTO_RECALIBRATE = True
+
+# Otomatik yeniden kalibrasyonda hedef değer olarak güvenilen stratejiler
+STRUCTURED_SOURCES = ("json_ld", "meta_tags", "microdata")
+
 
 # ── Strateji fonksiyonları ────────────────────────────────────────────────────
 
-def _try_selector(soup: BeautifulSoup, selector: str):
-    try:
-        el = soup.select_one(selector)
-        if el:
-            return extract_price_from_text(el.get_text(strip=True))
-    except Exception:
-        pass
+def _try_selector(soup: BeautifulSoup, selector: str | list[str]):
+    """Seçici (veya sıralı seçici seti) ile fiyat çeker; ilk başarılı seçici kazanır."""
+    selectors = [selector] if isinstance(selector, str) else selector
+    tracing.count("selector", len(selectors))
+    for sel in selectors:
+        try:
+            el = soup.select_one(sel)
+            if el:
+                price = extract_price_from_text(el.get_text(strip=True))
+                if price is not None:
+                    return price
+        except Exception:
+            continue
     return None
 
 
+def _parse_structured_price(raw):
+    """
+    Yapısal veri (JSON-LD, meta content) fiyatları makine formatındadır ("1199.00");
+    önce doğrudan float denenir, olmazsa serbest metin ayrıştırıcıya düşülür.
+    Makine formatındaki sonlu olmayan ("Infinity", "1e999") veya pozitif olmayan
+    ("-5.00", "0") değerler fiyat sayılmaz; metin ayrıştırıcı işareti düşürürdü.
+    """
+    text = str(raw).strip()
+    try:
+        value = float(text)
+    except ValueError:
+        return extract_price_from_text(text)
+    return value if math.isfinite(value) and value > 0 else None
+
+
 def _try_json_ld(soup: BeautifulSoup):
     """
     <script type="application/ld+json"> içindeki Product/Offer fiyatını çeker.
     Trendyol, Hepsiburada, Amazon gibi sitelerde çok güvenilir.
     """
-    for tag in soup.find_all("script", type="application/ld+json"):
+    scripts = soup.find_all("script", type="application/ld+json")
+    tracing.count("json_ld", len(scripts))
+    for tag in scripts:
         try:
             data = json.loads(tag.string or "")
         except Exception:
@@ -71,7 +119,7 @@ def _extract_ld_price(node):
     if type_str in {"offer", "aggregateoffer"}:
         raw = node.get("price") or node.get("lowPrice")
         if raw is not None:
-            return extract_price_from_text(str(raw))
+            return _parse_structured_price(raw)
 
     # Product → offers
     if type_str == "product":
@@ -109,7 +157,7 @@ def _try_meta_tags(soup: BeautifulSoup):
         el = soup.find(tag_name, attrs=attrs)
         if el:
             content = el.get("content", "")
-            price = extract_price_from_text(str(content))
+            price = _parse_structured_price(content)
             if price is not None:
                 return price
     return None
@@ -121,7 +169,7 @@ def _try_microdata(soup: BeautifulSoup):
         el = soup.find(attrs={"itemprop": attr})
         if el:
             content = el.get("content") or el.get_text(strip=True)
-            price = extract_price_from_text(str(content))
+            price = _parse_structured_price(content)
             if price is not None:
                 return price
     return None
@@ -140,6 +188,7 @@ def _try_class_search(soup: BeautifulSoup):
         price = extract_price_from_text(text)
         if price and len(text) < 40:
             candidates.append(price)
+    tracing.count("class_search", len(candidates))
     return min(candidates) if candidates else None
 
 
@@ -155,6 +204,7 @@ def _try_general(soup: BeautifulSoup):
         price = extract_price_from_text(text)
         if price:
             candidates.append(price)
+    tracing.count("general", len(candidates))
     return min(candidates) if candidates else None
 
 
@@ -200,48 +250,291 @@ def _pick_best(results: dict, initial_price: float | None) -> tuple[float, str]:
 
 # ── Ana fiyat çekme fonksiyonu ────────────────────────────────────────────────
 
-def get_product_price(url: str, selector: str | None = None,
-                      initial_price: float | None = None) -> tuple[float, str]:
+def product_selectors(product) -> list[str]:
+    """Ürünün sıralı seçici seti; eski kayıtlarda yalnızca price_selector vardır."""
+    raw = product["price_selectors"]
+    if raw:
+        try:
+            selectors = json.loads(raw)
+            if selectors:
+                return selectors
+        except ValueError:
+            pass
+    return [product["price_selector"]] if product["price_selector"] else []
+
+
+def active_selectors(product) -> list[str] | None:
+    """Stale değilse kontrol sırasında denenecek seçiciler, stale ise None."""
+    fail_count = product["selector_fail_count"] or 0
+    if fail_count >= SELECTOR_STALE_THRESHOLD:
+        return None
+    return product_selectors(product) or None
+
+
+def _run_strategy(name: str, func, *args):
+    with metrics.STRATEGY_SECONDS.time(strategy=name), tracing.stage(f"strategy.{name}"):
+        price = func(*args)
+    if price:
+        metrics.STRATEGY_HITS.inc(strategy=name)
+    return price
+
+
+def extract_price(soup: BeautifulSoup, selector: str | list[str] | None = None,
+                  initial_price: float | None = None) -> tuple[float, str, dict[str, float]]:
     """
-    URL'den fiyat çeker. Tüm stratejileri dener, en güvenilir sonucu döndürür.
-    Returns: (price, source_strategy)
+    Ayrıştırılmış sayfadan tüm stratejilerle fiyat çeker.
+    Returns: (price, source_strategy, tüm strateji sonuçları)
     """
-    html = fetch_html(url)
-    soup = BeautifulSoup(html, "html.parser")
-
     results: dict[str, float] = {}
 
     # 1. JSON-LD (en güvenilir, siteye özel değil)
-    p = _try_json_ld(soup)
+    p = _run_strategy("json_ld", _try_json_ld, soup)
     if p: results["json_ld"] = p
 
     # 2. Meta tags
-    p = _try_meta_tags(soup)
+    p = _run_strategy("meta_tags", _try_meta_tags, soup)
     if p: results["meta_tags"] = p
 
     # 3. Microdata
-    p = _try_microdata(soup)
+    p = _run_strategy("microdata", _try_microdata, soup)
     if p: results["microdata"] = p
 
     # 4. CSS Selector (kalibrasyondan gelen)
     if selector:
-        p = _try_selector(soup, selector)
+        p = _run_strategy("selector", _try_selector, soup, selector)
         if p:
             results["selector"] = p
 
     # 5. Class-based search
-    p = _try_class_search(soup)
+    p = _run_strategy("class_search", _try_class_search, soup)
     if p: results["class_search"] = p
 
     # 6. Genel arama (son çare)
     if not results:
-        p = _try_general(soup)
+        p = _run_strategy("general", _try_general, soup)
         if p: results["general"] = p
 
     if not results:
         raise ValueError("Sayfada hiçbir stratejiyle fiyat bulunamadı.")
 
-    return _pick_best(results, initial_price)
+    with metrics.PICK_BEST_SECONDS.time(), tracing.stage("pick_best"):
+        price, source = _pick_best(results, initial_price)
+    return price, source, results
+
+
+def _parse(html: str) -> BeautifulSoup:
+    metrics.PAGE_BYTES.observe(len(html), kind="parsed")
+    with metrics.PARSE_SECONDS.time(), tracing.stage("parse"):
+        return BeautifulSoup(html, "html.parser")
+
+
+def _slice_sufficient(results: dict, price: float, source: str, selector,
+                      initial_price: float | None) -> bool:
+    """
+    Dilimden gelen sonuç tam sayfadakiyle aynı olur mu? _pick_best tüm
+    stratejilerin uzlaşısına baktığından ve dilimde class_search eksik kaldığından
+    yalnızca kesin sonuç kabul edilir: bulunan tüm yapısal değerler (seçici varsa
+    seçici değeri de) birbirine eşit ve makul olmalı. Bu durumda tam sayfadaki
+    class_search seçimi değiştiremez; seçici bulunamadıysa veya bir yapısal
+    kaynak farklı fiyat veriyorsa tam ayrıştırmaya düşülür.
+    """
+    found = [k for k in STRUCTURED_SOURCES if k in results]
+    if selector:
+        if "selector" not in results:
+            return False
+        found.insert(0, "selector")
+    if not found:
+        return False
+    values = {results[k] for k in found}
+    return len(values) == 1 and _is_sane(price, initial_price) and source == found[0]
+
+
+def extract_from_html(html: str, selector: str | list[str] | None = None,
+                      initial_price: float | None = None, keep_tree: bool = False,
+                      bounded: bool = True):
+    """
+    HTML'den fiyat çeker; bellek sınırlı mod.
+    SLICE_MIN_BYTES'tan büyük sayfalarda önce dilim belgesi (slicer.py) denenir;
+    yeterliyse tam ağaç hiç kurulmaz. Aksi halde MAX_HTML_BYTES ile kesilmiş
+    sayfa ayrıştırılır. Ağaçlar iş biter bitmez decompose edilir.
+    keep_tree=True: tam ağaç kurulduysa döndürülür (çağıran decompose etmeli).
+    Returns: (price, source, results, tam ağaç | None)
+    """
+    metrics.PAGE_BYTES.observe(len(html), kind="html")
+    html = slicer.cap_html(html)
+    with slicer.measure_memory():
+        # Dilimde yalnızca baştaki çapalı seçiciler denenir (slicer.anchored_prefix)
+        usable = slicer.anchored_prefix(selector) if selector else None
+        if bounded and len(html) >= slicer.SLICE_MIN_BYTES:
+            sliced = None
+            if usable or not selector:
+                with tracing.stage("slice"):
+                    sliced = slicer.slice_html(html, usable)
+            if sliced is not None:
+                soup = _parse(sliced)
+                try:
+                    price, source, results = extract_price(soup, usable, initial_price)
+                    if _slice_sufficient(results, price, source, usable, initial_price):
+                        metrics.PAGE_SLICES.inc(outcome="used")
+                        return price, source, results, None
+                except ValueError:
+                    pass
+                finally:
+                    soup.decompose()
+            metrics.PAGE_SLICES.inc(outcome="fallback")
+
+        soup = _parse(html)
+        try:
+            price, source, results = extract_price(soup, selector, initial_price)
+        except Exception:
+            soup.decompose()
+            raise
+        if not keep_tree:
+            soup.decompose()
+            soup = None
+        return price, source, results, soup
+
+
+def get_product_price(url: str, selector: str | list[str] | None = None,
+                      initial_price: float | None = None) -> tuple[float, str]:
+    """
+    URL'den fiyat çeker. Tüm stratejileri dener, en güvenilir sonucu döndürür.
+    selector tek bir seçici ya da sıralı seçici seti olabilir.
+    Returns: (price, source_strategy)
+    """
+    html = fetch_html(url)
+    price, source, _, _ = extract_from_html(html, selector, initial_price)
+    return price, source
+
+
+# ── Otomatik yeniden kalibrasyon ──────────────────────────────────────────────
+
+def _consistent_fallback(product, results: dict[str, float], price: float, source: str) -> bool:
+    """
+    Stale seçici yerine kullanılacak fiyat güvenilir mi?
+    Yapısal bir kaynaktan (JSON-LD/meta/microdata) gelmeli ve ya başka bir yapısal
+    kaynakla ya da aynı kaynaktan gelen bir önceki kontrolle uyuşmalı.
+    """
+    if source not in STRUCTURED_SOURCES:
+        return False
+    for key in STRUCTURED_SOURCES:
+        if key != source and key in results and abs(results[key] - price) < 0.01:
+            return True
+    previous = product["current_price"]
+    return (
+        product["last_price_source"] == source
+        and previous is not None
+        and abs(previous - price) < 0.01
+    )
+
+
+def auto_recalibrate(soup: BeautifulSoup, product, price: float) -> list[str] | None:
+    """
+    Zaten çekilmiş sayfada güvenilir fiyatı taşıyan görünür elementi bulur ve
+    yeni seçici setini kaydeder (fail sayacı sıfırlanır). Bulunamazsa None.
+    """
+    index = CandidateIndex(soup)
+    best = index.lookup(price, tolerance=0)
+    if best is None or any(parent.name in _HIDDEN_TAGS for parent in best.parents):
+        return None
+    selectors = build_selector_set(soup, best, index)
+    database.update_product_selector(product["id"], selectors[0], selectors)
+    return selectors
+
+
+# ── Sonuç kaydı ───────────────────────────────────────────────────────────────
+
+def record_check_result(product, price: float, source: str,
+                        selector_ok: bool | None = True) -> bool:
+    """
+    Kontrol sonucunu yazar (products + price_history) ve canlı olayları yayınlar.
+    selector_ok: seçici fiyat verdiyse True, denenip başarısız olduysa False,
+    hiç denenmediyse (stale) None.
+    Returns: alarm tetiklendiyse True
+    """
+    pid = product["id"]
+    database.update_product_price(pid, price, source, selector_ok)
+    database.add_price_history(pid, price, source)
+    return events.emit_check_events(product, price, source)
+
+
+def check_product(product, trace: bool = False) -> dict:
+    """
+    Tek bir ürünü kontrol eder: sayfayı çeker, fiyatı bulur, sonucu kaydeder.
+    Seçici stale ise ve yapısal bir kaynak tutarlı fiyat verdiyse aynı sayfa
+    üzerinden otomatik yeniden kalibrasyon yapılır.
+    trace=True: CHECK_PROFILING kapalı olsa da bu kontrol için iz kaydedilir.
+    Hata durumunda başarısızlık kaydedilir ve hata yeniden fırlatılır.
+    """
+    pid = product["id"]
+    domain = metrics.domain_of(product["url"])
+    selectors = active_selectors(product)
+    if selectors is None and product["price_selector"]:
+        metrics.STALE_SELECTORS.inc(domain=domain)
+
+    html = tier = None
+    with metrics.CHECK_SECONDS.time(), tracing.start(pid, product["url"], force=trace) as tr:
+        try:
+            html, tier = fetch_page(product["url"], wait_selectors=selectors)
+            if tr is not None:
+                tr.fetch_tier = tier
+                tracing.attach_html(html)
+            price, source, results, soup = extract_from_html(
+                html, selectors, product["initial_price"], keep_tree=True)
+        except Exception as exc:
+            metrics.CHECKS.inc(domain=domain, outcome="failure")
+            database.record_selector_failure(pid, str(exc))
+            if html is not None:
+                snapshots.save(pid, html, tier, error=str(exc))
+            raise
+
+        with tracing.stage("snapshot"):
+            snapshots.save(pid, html, tier, price, source)
+
+        selector_ok = None if selectors is None else "selector" in results
+        if selector_ok is False:
+            metrics.SELECTOR_MISSES.inc(domain=domain)
+        with tracing.stage("anomaly"):
+            quarantined = anomaly.screen_price(product, price, source)
+        with metrics.DB_WRITE_SECONDS.time(), tracing.stage("db_write"):
+            if quarantined is None:
+                alert_triggered = record_check_result(product, price, source, selector_ok)
+            else:
+                database.mark_product_quarantined(
+                    pid, f"Şüpheli fiyat karantinada: {price} (medyan {quarantined['median']})"
+                )
+                alert_triggered = False
+        metrics.CHECKS.inc(domain=domain, outcome="success")
+
+        recalibrated = None
+        try:
+            if (AUTO_RECALIBRATE and quarantined is None and selectors is None
+                    and product["price_selector"]
+                    and _consistent_fallback(product, results, price, source)):
+                with tracing.stage("auto_recalibrate"):
+                    if soup is None:
+                        # Fiyat dilimden geldi; seçici için tam sayfa gerekir
+                        soup = _parse(slicer.cap_html(html))
+                    recalibrated = auto_recalibrate(soup, product, price)
+                metrics.RECALIBRATIONS.inc(
+                    domain=domain, outcome="success" if recalibrated else "not_found"
+                )
+        finally:
+            if soup is not None:
+                soup.decompose()
+
+        if tr is not None:
+            tr.price, tr.source = price, source
+
+    return {
+        "price": price,
+        "source": source,
+        "alert_triggered": alert_triggered,
+        "selector_used": selectors is not None,
+        "recalibrated": recalibrated,
+        "fetch_tier": tier,
+        "quarantined": quarantined,
+    }
 
 
 # ── Toplu fiyat kontrol ───────────────────────────────────────────────────────
@@ -255,36 +548,36 @@ def check_prices():
         url = product["url"]
         selector = product["price_selector"]
         fail_count = product["selector_fail_count"] or 0
-        initial = product["initial_price"]
-
-        # Seçici stale ise bu turda kullanma
-        active_selector = None if fail_count >= SELECTOR_STALE_THRESHOLD else selector
 
-        print(f"\n[{pid}] {product.get('name') or url[:60]}")
+        print(f"\n[{pid}] {product['name'] or url[:60]}")
         if fail_count >= SELECTOR_STALE_THRESHOLD:
             print(f"   ⚠ Seçici stale ({fail_count} başarısız) — diğer stratejiler kullanılacak.")
 
         try:
-            price, source = get_product_price(url, active_selector, initial)
-            database.update_product_price(pid, price, source)
-            database.add_price_history(pid, price, source)
-            print(f"   Fiyat: {price} TL  [kaynak: {source}]")
-            print(f"   Hedef: {product['target_price']} TL")
+            result = check_product(product)
+        except Exception as exc:
+            print(f"   HATA: {exc}")
+            continue
 
-            if selector and active_selector:
-                pass  # seçici çalışıyorsa fail_count 0'a sıfırlanır (update_product_price içinde)
-            elif selector and not active_selector:
-                print("   (stale seçici atlandı, fallback kullanıldı)")
+        price = result["price"]
+        if result["quarantined"]:
+            q = result["quarantined"]
+            print(f"   ⚠ Şüpheli fiyat {price} TL karantinaya alındı "
+                  f"(medyan {q['median']}, skor {q['score']})")
+            continue
+        print(f"   Fiyat: {price} TL  [kaynak: {result['source']}]")
+        print(f"   Hedef: {product['target_price']} TL")
 
-            if price <= product["target_price"]:
-                print("   HEDEF FIYATA ULASTI!")
+        if selector and not result["selector_used"]:
+            print("   (stale seçici atlandı, fallback kullanıldı)")
+        if result["recalibrated"]:
+            print(f"   Seçici otomatik yenilendi: {result['recalibrated'][0]}")
 
-            if product["alert_enabled"] and product["alert_price"] and price <= product["alert_price"]:
-                print(f"   ALARM TETIKLENDI! {price} <= {product['alert_price']}")
+        if price <= product["target_price"]:
+            print("   HEDEF FIYATA ULASTI!")
 
-        except Exception as exc:
-            database.record_selector_failure(pid, str(exc))
-            print(f"   HATA: {exc}")
+        if result["alert_triggered"]:
+            print(f"   ALARM TETIKLENDI! {price} <= {product['alert_price']}")
 
 
 def run_loop(check_interval_minutes: int = 30):
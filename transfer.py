@@ -0,0 +1,219 @@
+"""
+transfer.py — Ürün ve fiyat geçmişi için akışlı NDJSON/CSV dışa/içe aktarım.
+
+Dışa aktarım satırları veritabanı cursor'ından parça parça okuyup metin
+parçaları üretir; içe aktarım istek gövdesini satır satır ayrıştırır.
+İki yönde de bellek kullanımı kayıt sayısından bağımsızdır.
+CSV'de alan içinde satır sonu desteklenmez (her kayıt tek satır).
+"""
+
+import codecs
+import csv
+import datetime
+import io
+import json
+import math
+import time
+
+from price_utils import extract_price_from_text
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Dışa aktarımda tek parçada gönderilecek kayıt sayısı
+EXPORT_CHUNK_ROWS = 500
+
+
+def check_format(fmt: str) -> str:
+    fmt = (fmt or "ndjson").lower()
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Desteklenmeyen format: {fmt} (ndjson veya csv)")
+    return fmt
+
+
+# ── Dışa aktarım ──────────────────────────────────────────────────────────────
+
+def encode_rows(rows, fmt: str):
+    """Satır (sqlite3.Row / dict) akışını NDJSON/CSV metin parçalarına çevirir."""
+    if fmt == "ndjson":
+        buf = []
+        for row in rows:
+            buf.append(json.dumps(dict(row), ensure_ascii=False))
+            if len(buf) >= EXPORT_CHUNK_ROWS:
+                yield "\n".join(buf) + "\n"
+                buf = []
+        if buf:
+            yield "\n".join(buf) + "\n"
+        return
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    pending = 0
+    keys = None
+    for row in rows:
+        if keys is None:
+            keys = list(row.keys())
+            writer.writerow(keys)
+        writer.writerow(["" if row[k] is None else row[k] for k in keys])
+        pending += 1
+        if pending >= EXPORT_CHUNK_ROWS:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+            pending = 0
+    if out.tell():
+        yield out.getvalue()
+
+
+# ── İçe aktarım ───────────────────────────────────────────────────────────────
+
+async def iter_records(chunks, fmt: str):
+    """
+    Byte parçalarından (request.stream()) kayıtları üretir.
+    Yields: (satır_no, dict) — bozuk satırlarda dict yerine ValueError
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header = None
+    pending = ""
+    lineno = 0
+
+    def parse(line: str):
+        nonlocal header
+        if fmt == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                return ValueError(f"Geçersiz JSON: {exc}")
+            if not isinstance(record, dict):
+                return ValueError("Her satır bir JSON nesnesi olmalı")
+            return record
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [h.strip() for h in values]
+            return None
+        return dict(zip(header, values))
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            lineno += 1
+            line = line.rstrip("\r")
+            if not line.strip():
+                continue
+            record = parse(line)
+            if record is not None:
+                yield lineno, record
+
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        record = parse(pending.rstrip("\r"))
+        if record is not None:
+            yield lineno + 1, record
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _price(value, field: str, required: bool = False):
+    """Sayı veya fiyat metni; "nan", "inf", sıfır ve negatif değerler reddedilir."""
+    if _blank(value):
+        if required:
+            raise ValueError(f"'{field}' gerekli")
+        return None
+    text = str(value).strip()
+    try:
+        parsed = float(value) if isinstance(value, (int, float)) else float(text)
+    except ValueError:
+        parsed = extract_price_from_text(text)
+        if parsed is None:
+            raise ValueError(f"'{field}' fiyat olarak okunamadı: {text!r}")
+    if not math.isfinite(parsed) or parsed <= 0:
+        raise ValueError(f"'{field}' pozitif bir fiyat olmalı: {text!r}")
+    return parsed
+
+
+def normalize_product(record: dict) -> dict:
+    """
+    İçe aktarılan ürün kaydını bulk_add_products formatına çevirir.
+    Fiyat: price_text (sayfada görünen metin) veya initial_price / current_price.
+    Seçici yoksa ürün worker kuyruğunda kalibre edilir.
+    """
+    url = str(record.get("url") or "").strip()
+    if not url:
+        raise ValueError("'url' gerekli")
+
+    if not _blank(record.get("price_text")):
+        initial = extract_price_from_text(str(record["price_text"]))
+        if not initial:
+            raise ValueError("'price_text' içinden fiyat çıkarılamadı")
+    else:
+        initial = _price(record.get("initial_price"), "initial_price")
+        if initial is None:
+            initial = _price(record.get("current_price"), "price_text / initial_price", True)
+
+    selectors = record.get("price_selectors")
+    if isinstance(selectors, str) and not _blank(selectors):
+        try:
+            selectors = json.loads(selectors)
+        except ValueError:
+            raise ValueError("'price_selectors' JSON liste olmalı")
+    if _blank(selectors) or not selectors:
+        selectors = None
+    elif not isinstance(selectors, list):
+        raise ValueError("'price_selectors' JSON liste olmalı")
+    selector = None if _blank(record.get("price_selector")) else str(record["price_selector"])
+    if selector is None and selectors:
+        selector = selectors[0]
+
+    alert_enabled = record.get("alert_enabled")
+    if isinstance(alert_enabled, str):
+        alert_enabled = alert_enabled.strip().lower() in {"1", "true", "yes", "evet"}
+
+    return {
+        "url": url,
+        "name": None if _blank(record.get("name")) else str(record["name"]).strip(),
+        "target_price": _price(record.get("target_price"), "target_price", True),
+        "initial_price": initial,
+        "current_price": _price(record.get("current_price"), "current_price"),
+        "price_selector": selector,
+        "price_selectors": json.dumps(selectors) if selectors else None,
+        "alert_price": _price(record.get("alert_price"), "alert_price"),
+        "alert_enabled": bool(alert_enabled),
+    }
+
+
+def _epoch(value, field: str) -> int | None:
+    """Epoch saniye veya ISO tarih metni → epoch (saat dilimsiz metin UTC kabul edilir)."""
+    if _blank(value):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip()
+    try:
+        return int(float(text))
+    except ValueError:
+        pass
+    try:
+        moment = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"'{field}' zaman olarak okunamadı: {text!r}")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return int(moment.timestamp())
+
+
+def normalize_history(record: dict) -> tuple[str, float, str | None, int | None]:
+    """Returns: (url, price, source, recorded_at epoch)"""
+    url = str(record.get("url") or "").strip()
+    if not url:
+        raise ValueError("'url' gerekli")
+    price = _price(record.get("price"), "price", True)
+    source = None if _blank(record.get("source")) else str(record["source"])
+    recorded_at = _epoch(record.get("recorded_at"), "recorded_at")
+    if recorded_at is not None and recorded_at > time.time() + 86400:
+        raise ValueError("'recorded_at' gelecekte olamaz")
+    return url, price, source, recorded_at
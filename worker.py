@@ -0,0 +1,172 @@
+"""
+worker.py — API sürecinden bağımsız fiyat kontrol worker'ları.
+
+API yalnızca istekleri karşılar; sayfa çekme, ayrıştırma ve fiyat çıkarma
+işleri check_tasks kuyruğundan (SQLite) görev alan ayrı süreçlerde çalışır.
+Toplu içe aktarılan ürünlerin kalibrasyonu da aynı kuyruktan ('calibrate') gelir.
+Ana süreç isteğe bağlı olarak zamanlayıcı görevi de görür: son kontrolü
+eskimiş ürünleri kuyruğa ekler, çöken worker'larda kalan görevleri geri alır.
+
+Kullanım:
+    python worker.py                      # CPU sayısı kadar worker + zamanlayıcı
+    python worker.py --processes 4 --schedule-minutes 30
+    python worker.py --schedule-minutes 0 # yalnızca kuyruk tüketici
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import database
+import metrics
+import snapshots
+
+# Kuyruk boşken bekleme süresi (sn)
+POLL_INTERVAL = 2.0
+
+# Bir görevin "running" kalabileceği en uzun süre; aşılırsa tekrar kuyruğa alınır
+TASK_LEASE_SECONDS = 300
+
+# Bir görev en fazla kaç kez denenir
+MAX_TASK_ATTEMPTS = 3
+
+# Zamanlayıcı turu aralığı (sn)
+SCHEDULER_TICK = 30
+
+
+def process_task(task) -> dict | None:
+    """
+    Tek bir kuyruk görevini çalıştırır ve sonucunu kuyruğa yazar.
+    kind='calibrate' görevleri (toplu içe aktarım) önce seçici seti kurar.
+    """
+    # Kazıma yığını (Playwright, bs4) yalnızca worker süreçlerinde yüklenir
+    from calibrate import calibrate_existing_product
+    from tracker import check_product
+
+    product = database.get_product_by_id(task["product_id"])
+    if product is None:
+        database.finish_check_task(task["id"], "ürün bulunamadı")
+        return None
+    try:
+        if task["kind"] == "calibrate":
+            selectors = calibrate_existing_product(product)
+            result = {"price": product["initial_price"], "source": f"calibrated:{selectors[0]}"}
+        else:
+            result = check_product(product)
+    except RuntimeError as exc:
+        # Sayfa çekildi ama fiyat bulunamadı: aynı sayfada tekrar denemek sonucu
+        # değiştirmez, görev kalıcı olarak başarısız
+        if task["kind"] == "calibrate":
+            database.record_selector_failure(product["id"], str(exc))
+        database.finish_check_task(task["id"], str(exc))
+        return None
+    except Exception as exc:
+        # Ağ hatası, 5xx, zaman aşımı: geçici. Seçicisiz ürün başka yoldan kalibre
+        # edilmediğinden kalibrasyon görevi MAX_TASK_ATTEMPTS'e kadar tekrar kuyruğa
+        # alınır; kontrol görevleri zamanlayıcıyla zaten yeniden gelir.
+        if task["kind"] == "calibrate":
+            if not database.retry_check_task(task["id"], str(exc), MAX_TASK_ATTEMPTS):
+                database.record_selector_failure(product["id"], str(exc))
+            return None
+        database.finish_check_task(task["id"], str(exc))
+        return None
+    database.finish_check_task(task["id"])
+    return result
+
+
+def run_worker(worker_id: str, poll_interval: float = POLL_INTERVAL,
+               metrics_port: int | None = None):
+    """Kuyruktan görev alıp işleyen sonsuz döngü (tek süreç)."""
+    if metrics_port:
+        metrics.serve(metrics_port)
+    print(f"[{worker_id}] worker başlatıldı.")
+    try:
+        while True:
+            task = database.claim_check_task(worker_id)
+            if task is None:
+                time.sleep(poll_interval)
+                continue
+            result = process_task(task)
+            if result:
+                print(f"[{worker_id}] #{task['product_id']}: {result['price']} TL "
+                      f"[{result['source']}]")
+            else:
+                print(f"[{worker_id}] #{task['product_id']}: başarısız")
+    except KeyboardInterrupt:
+        pass
+    print(f"[{worker_id}] worker durdu.")
+
+
+def _scheduler_tick(schedule_minutes: float):
+    database.requeue_stale_tasks(TASK_LEASE_SECONDS, MAX_TASK_ATTEMPTS)
+    database.prune_check_tasks()
+    database.ensure_history_partitions()
+    snapshots.prune()
+    if schedule_minutes > 0:
+        added = database.enqueue_due_products(schedule_minutes)
+        if added:
+            print(f"[scheduler] {added} ürün kuyruğa eklendi. {database.get_queue_stats()}")
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TagTrack fiyat kontrol worker'ları")
+    parser.add_argument("--processes", type=int,
+                        default=int(os.getenv("WORKER_PROCESSES", os.cpu_count() or 1)),
+                        help="worker süreç sayısı")
+    parser.add_argument("--schedule-minutes", type=float,
+                        default=float(os.getenv("CHECK_INTERVAL_MINUTES", "30")),
+                        help="bu süreden eski kontrolleri kuyruğa ekle (0 = zamanlayıcı kapalı)")
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL,
+                        help="kuyruk boşken bekleme süresi (sn)")
+    parser.add_argument("--metrics-port", type=int,
+                        default=int(os.getenv("WORKER_METRICS_PORT", "0")),
+                        help="worker i, /metrics'i port+i üzerinde yayınlar (0 = kapalı)")
+    args = parser.parse_args()
+
+    database.setup_database()
+    # docker stop → SIGTERM; Ctrl+C ile aynı kapanış yolu
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+
+    host = socket.gethostname()
+    ctx = multiprocessing.get_context("spawn")
+    workers: dict[str, tuple[multiprocessing.Process, int]] = {}
+
+    def start(worker_id, index):
+        port = args.metrics_port + index if args.metrics_port else None
+        proc = ctx.Process(target=run_worker, args=(worker_id, args.poll, port), daemon=True)
+        proc.start()
+        workers[worker_id] = (proc, index)
+
+    for i in range(max(1, args.processes)):
+        start(f"{host}-{i}", i)
+
+    print(f"{len(workers)} worker çalışıyor. (Çıkmak için CTRL+C)")
+    try:
+        while True:
+            _scheduler_tick(args.schedule_minutes)
+            for worker_id, (proc, index) in list(workers.items()):
+                if not proc.is_alive():
+                    print(f"[{worker_id}] beklenmedik şekilde durdu, yeniden başlatılıyor.")
+                    start(worker_id, index)
+            time.sleep(SCHEDULER_TICK)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Kapanış sırasında gelen ikinci sinyal join'i yarıda kesmesin
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        for proc, _ in workers.values():
+            proc.terminate()
+        for proc, _ in workers.values():
+            proc.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()